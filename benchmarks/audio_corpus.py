@@ -0,0 +1,73 @@
+"""Local audio corpus helpers shared by the voice benchmarks.
+
+A corpus is a directory of audio files, each optionally accompanied by a reference
+transcript with the same name and a .txt extension. ``generate_corpus`` builds a
+German/English OGG/Opus corpus of varying lengths with espeak-ng and ffmpeg, the
+same container and codec Telegram uses for voice notes.
+"""
+import shutil
+import subprocess
+from pathlib import Path
+
+AUDIO_EXTENSIONS = {".ogg", ".oga", ".wav", ".mp3", ".m4a", ".flac"}
+
+SENTENCES = {
+    "de": [
+        "Wie sind eure Öffnungszeiten am Wochenende?",
+        "Habt ihr vegetarisches Essen im Café?",
+        "Ist der Spielplatz mit dem Rollstuhl zugänglich?",
+        "Ich möchte gerne eine Geburtstagsfeier für zehn Kinder buchen.",
+        "Gibt es ruhige Bereiche für Kinder mit Autismus?",
+        "Wie viel kostet ein Familienticket für zwei Erwachsene und drei Kinder?"
+    ],
+    "en": [
+        "What are your opening hours on the weekend?",
+        "Do you have vegetarian food in the cafe?",
+        "Is the playground accessible by wheelchair?",
+        "I would like to book a birthday party for ten children.",
+        "Are there quiet zones for children with autism?",
+        "How much is a family ticket for two adults and three children?"
+    ]
+}
+
+# number of sentences per clip: short questions, a longer message and a long rambling note
+LENGTHS = {"short": 1, "medium": 4, "long": 14}
+
+
+def load_corpus(corpus_dir: Path) -> list:
+    """Return (name, audio bytes, reference text or None) for every audio file in the directory."""
+    clips = []
+    for path in sorted(Path(corpus_dir).iterdir()):
+        if path.suffix.lower() not in AUDIO_EXTENSIONS:
+            continue
+        reference_path = path.with_suffix(".txt")
+        reference = reference_path.read_text(encoding="utf-8").strip() if reference_path.exists() else None
+        clips.append((path.name, path.read_bytes(), reference))
+    return clips
+
+
+def generate_corpus(corpus_dir: Path) -> list:
+    """Synthesize a German/English OGG/Opus corpus with espeak-ng and ffmpeg."""
+    if not shutil.which("espeak-ng") or not shutil.which("ffmpeg"):
+        raise RuntimeError("generating a corpus requires espeak-ng and ffmpeg on PATH")
+
+    corpus_dir = Path(corpus_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+
+    for language, sentences in SENTENCES.items():
+        for length, count in LENGTHS.items():
+            text = " ".join(sentences[i % len(sentences)] for i in range(count))
+            target = corpus_dir / f"{language}_{length}.ogg"
+
+            wav = subprocess.run(
+                ["espeak-ng", "-v", language, "-s", "150", "--stdout", text],
+                capture_output=True, check=True
+            ).stdout
+            subprocess.run(
+                ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-i", "pipe:0",
+                 "-ac", "1", "-ar", "48000", "-c:a", "libopus", "-b:a", "32k", str(target)],
+                input=wav, capture_output=True, check=True
+            )
+            target.with_suffix(".txt").write_text(text, encoding="utf-8")
+
+    return load_corpus(corpus_dir)
@@ -0,0 +1,200 @@
+"""Local stand-in for the LLM task backend, for offline load testing.
+
+Implements the contract utils/llm_connector.py relies on:
+
+    POST /tasks                      -> {"task_id": ...}
+    GET  /tasks/{id}/response        -> {"response": null} until done, then the messages
+    GET  /tasks/{id}/response?wait=s -> long poll, held open until done or s seconds pass
+    GET  /tasks/{id}/events          -> server-sent events with the same payload
+
+Processing latency is drawn from a configurable distribution, only
+--max-concurrent tasks are processed at a time (the rest queue, like on a busy
+GPU), and --error-rate of all requests fail with HTTP 500. With --stream, answers
+are generated word by word and the partial text is exposed while polling
+("partial") and as server-sent "delta" events. GET /stats reports
+what the server saw; POST /config changes the settings of a running server, e.g.
+to degrade the backend in the middle of a load test.
+
+    python benchmarks/fake_llm_server.py --port 8765 --latency lognormal --latency-ms 800 --max-concurrent 4
+    LLM_API_URL=http://127.0.0.1:8765 python main.py
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+
+from aiohttp import web
+
+DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+class FakeBackend:
+    def __init__(self, latency: str, latency_ms: float, latency_spread: float, error_rate: float,
+                 max_concurrent: int, answer_words: int, stream: bool = False):
+        self.config = {
+            "latency": latency,
+            "latency_ms": latency_ms,
+            "latency_spread": latency_spread,
+            "error_rate": error_rate,
+            "max_concurrent": max_concurrent,
+            "answer_words": answer_words,
+            "stream": stream
+        }
+        self.tasks = {}
+        self.slots = asyncio.Semaphore(max_concurrent)
+        self.stats = {"submitted": 0, "completed": 0, "polls": 0, "errors": 0, "processing": 0, "queued": 0}
+
+    def sample_latency(self) -> float:
+        mean = self.config["latency_ms"] / 1000
+        spread = self.config["latency_spread"]
+        kind = self.config["latency"]
+
+        if kind == "uniform":
+            return random.uniform(mean * (1 - spread), mean * (1 + spread))
+        if kind == "exponential":
+            return random.expovariate(1 / mean) if mean > 0 else 0.0
+        if kind == "lognormal":
+            # spread is the sigma of the underlying normal; mu is chosen so the mean stays latency_ms
+            return random.lognormvariate(0, spread) * mean / math.exp(spread * spread / 2) if mean > 0 else 0.0
+        return mean
+
+    def should_fail(self) -> bool:
+        if random.random() < self.config["error_rate"]:
+            self.stats["errors"] += 1
+            return True
+        return False
+
+    async def process(self, task_id: str):
+        task = self.tasks[task_id]
+        self.stats["queued"] += 1
+        async with self.slots:
+            self.stats["queued"] -= 1
+            self.stats["processing"] += 1
+            latency = self.sample_latency()
+            words = f"Fake answer to: {task['question']} ".split() + ["answer"] * self.config["answer_words"]
+            if self.config["stream"]:
+                # generate word by word, exposing the partial answer while it grows
+                for count in range(1, len(words) + 1):
+                    await asyncio.sleep(latency / len(words))
+                    task["partial"] = " ".join(words[:count])
+                    task["progress"].set()
+            else:
+                await asyncio.sleep(latency)
+            self.stats["processing"] -= 1
+
+        task["response"] = [{
+            "role": "assistant",
+            "content": [{"type": "text", "text": " ".join(words)}]
+        }]
+        task["finished_at"] = time.monotonic()
+        task["done"].set()
+        self.stats["completed"] += 1
+
+    async def submit(self, request: web.Request) -> web.Response:
+        if self.should_fail():
+            return web.json_response({"error": "simulated failure"}, status=500)
+
+        payload = await request.json()
+        question = payload.get("messages", [{}])[-1].get("content", [{}])[0].get("text", "")
+        task_id = uuid.uuid4().hex
+        self.tasks[task_id] = {"question": question, "response": None, "partial": "", "done": asyncio.Event(),
+                               "progress": asyncio.Event(), "created_at": time.monotonic(), "finished_at": None}
+        asyncio.create_task(self.process(task_id))
+        self.stats["submitted"] += 1
+        return web.json_response({"task_id": task_id})
+
+    async def response(self, request: web.Request) -> web.Response:
+        self.stats["polls"] += 1
+        task = self.tasks.get(request.match_info["task_id"])
+        if task is None:
+            return web.json_response({"error": "unknown task"}, status=404)
+        if self.should_fail():
+            return web.json_response({"error": "simulated failure"}, status=500)
+
+        wait = float(request.query.get("wait", "0") or 0)
+        if wait > 0 and not task["done"].is_set():
+            try:
+                await asyncio.wait_for(task["done"].wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+        return web.json_response({"response": task["response"], "partial": task["partial"] or None})
+
+    async def events(self, request: web.Request) -> web.StreamResponse:
+        task = self.tasks.get(request.match_info["task_id"])
+        if task is None:
+            return web.json_response({"error": "unknown task"}, status=404)
+
+        stream = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await stream.prepare(request)
+        sent = ""
+        while not task["done"].is_set():
+            if task["partial"] != sent:
+                await stream.write(f"data: {json.dumps({'response': None, 'delta': task['partial'][len(sent):]})}\n\n".encode())
+                sent = task["partial"]
+            task["progress"].clear()
+            done = asyncio.ensure_future(task["done"].wait())
+            progress = asyncio.ensure_future(task["progress"].wait())
+            await asyncio.wait({done, progress}, return_when=asyncio.FIRST_COMPLETED)
+            done.cancel()
+            progress.cancel()
+        await stream.write(f"data: {json.dumps({'response': task['response']})}\n\n".encode())
+        await stream.write_eof()
+        return stream
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        finished = [task["finished_at"] - task["created_at"] for task in self.tasks.values() if task["finished_at"]]
+        return web.json_response({
+            "config": self.config,
+            **self.stats,
+            "avg_task_seconds": sum(finished) / len(finished) if finished else 0.0
+        })
+
+    async def set_config(self, request: web.Request) -> web.Response:
+        changes = await request.json()
+        unknown = set(changes) - set(self.config)
+        if unknown:
+            return web.json_response({"error": f"unknown settings: {sorted(unknown)}"}, status=400)
+
+        self.config.update(changes)
+        if "max_concurrent" in changes:
+            # tasks already holding a slot finish on the old semaphore
+            self.slots = asyncio.Semaphore(self.config["max_concurrent"])
+        return web.json_response(self.config)
+
+
+def create_app(backend: FakeBackend) -> web.Application:
+    app = web.Application()
+    app.add_routes([
+        web.post("/tasks", backend.submit),
+        web.get("/tasks/{task_id}/response", backend.response),
+        web.get("/tasks/{task_id}/events", backend.events),
+        web.get("/stats", backend.get_stats),
+        web.post("/config", backend.set_config)
+    ])
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", choices=DISTRIBUTIONS, default="lognormal", help="processing latency distribution")
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="mean processing latency")
+    parser.add_argument("--latency-spread", type=float, default=0.5,
+                        help="relative spread for uniform, sigma for lognormal")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with HTTP 500")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="tasks processed at the same time")
+    parser.add_argument("--answer-words", type=int, default=20)
+    parser.add_argument("--stream", action="store_true", help="expose partial answers while tasks are processed")
+    args = parser.parse_args()
+
+    backend = FakeBackend(args.latency, args.latency_ms, args.latency_spread, args.error_rate,
+                          args.max_concurrent, args.answer_words, args.stream)
+    web.run_app(create_app(backend), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""Drive utils.llm_connector.query_llm at fixed concurrency levels.
+
+Meant to run against benchmarks/fake_llm_server.py, so connector throughput,
+tail latency and behaviour under backend degradation can be measured without
+network access. Every level sends unique questions (unless --repeat is set), so
+the answer cache and request coalescing do not hide the backend.
+
+    python benchmarks/fake_llm_server.py --port 8765 --max-concurrent 4 &
+    python benchmarks/llm_load_test.py --url http://127.0.0.1:8765 --concurrency 1,4,16,64 --requests 200
+    python benchmarks/llm_load_test.py --url http://127.0.0.1:8765 --degrade error_rate=0.5 --concurrency 16
+    python benchmarks/llm_load_test.py --url http://127.0.0.1:8765 --stream   # server started with --stream
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.stats import percentile
+
+QUESTIONS = [
+    "Can I bring my own birthday cake?",
+    "Do you have parking for families?",
+    "Is there a discount for siblings?",
+    "Kann man Socken vor Ort kaufen?",
+    "Gibt es Wickeltische in den Toiletten?",
+    "How old do children have to be for the trampolines?"
+]
+
+
+def parse_degrade(values: list) -> dict:
+    changes = {}
+    for value in values:
+        name, _, setting = value.partition("=")
+        try:
+            changes[name] = json.loads(setting)
+        except ValueError:
+            changes[name] = setting
+    return changes
+
+
+async def run_level(llm, concurrency: int, requests: int, repeat: bool, stream: bool, level_index: int) -> dict:
+    llm.answer_cache.clear()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    first_text = []
+    outcomes = {"answered": 0, "errors": 0, "fallbacks": 0}
+
+    async def one_request(index: int):
+        question = QUESTIONS[index % len(QUESTIONS)]
+        if not repeat:
+            question = f"{question} (run {level_index}, request {index})"
+        language = "de" if question.startswith(("Kann", "Gibt")) else "en"
+
+        async with semaphore:
+            started = time.perf_counter()
+            if stream:
+                answer = ""
+                async for delta in llm.stream_llm(question, language, user_id="load-test"):
+                    if not answer:
+                        first_text.append(time.perf_counter() - started)
+                    answer += delta
+            else:
+                answer = await llm.query_llm(question, language, user_id="load-test")
+            latencies.append(time.perf_counter() - started)
+
+        if answer.startswith("❌"):
+            outcomes["errors"] += 1
+        elif answer.startswith("Fake answer"):
+            outcomes["answered"] += 1
+        else:
+            # answered locally by the open circuit breaker
+            outcomes["fallbacks"] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_request(index) for index in range(requests)))
+    wall_seconds = time.perf_counter() - started
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        **outcomes,
+        "wall_seconds": wall_seconds,
+        "requests_per_second": requests / wall_seconds,
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) * 1000,
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000
+        },
+        "first_text_ms": {
+            "p50": percentile(first_text, 50) * 1000,
+            "p95": percentile(first_text, 95) * 1000
+        } if stream else None,
+        "admission": llm.get_admission_stats(),
+        "pool": llm.get_pool_stats()
+    }
+
+
+async def run(args) -> dict:
+    # imported here so LLM_API_URL and friends are read after main() set them
+    import utils.llm_connector as llm
+
+    llm.start_http_client()
+    try:
+        if args.degrade:
+            response = await llm.get_http_client().post(f"{llm.API_URL}/config", json=parse_degrade(args.degrade))
+            response.raise_for_status()
+
+        levels = []
+        for index, concurrency in enumerate(args.concurrency):
+            level = await run_level(llm, concurrency, args.requests, args.repeat, args.stream, index)
+            latency = level["latency_ms"]
+            print(f"x{concurrency:<4} {level['requests_per_second']:7.2f} req/s  "
+                  f"p50 {latency['p50']:6.0f} ms  p95 {latency['p95']:6.0f} ms  p99 {latency['p99']:6.0f} ms  "
+                  f"errors {level['errors']}  fallbacks {level['fallbacks']}",
+                  file=sys.stderr)
+            levels.append(level)
+
+        server = (await llm.get_http_client().get(f"{llm.API_URL}/stats")).json()
+        return {
+            "levels": levels,
+            "polling": {key: value for key, value in llm.get_polling_stats().items() if key != "recent"},
+            "coalescing": llm.get_coalescing_stats(),
+            "streaming": llm.get_streaming_stats(),
+            "answer_cache": llm.get_answer_cache_stats(),
+            "server": server
+        }
+    finally:
+        await llm.close_http_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8765", help="fake LLM server")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        type=lambda value: [int(level) for level in value.split(",")])
+    parser.add_argument("--requests", type=int, default=100, help="requests per concurrency level")
+    parser.add_argument("--repeat", action="store_true", help="reuse the same questions (exercises cache and coalescing)")
+    parser.add_argument("--degrade", action="append", default=[], metavar="SETTING=VALUE",
+                        help="change a server setting before the run, e.g. error_rate=0.3 or latency_ms=4000")
+    parser.add_argument("--stream", action="store_true", help="use stream_llm and report time to first text")
+    parser.add_argument("--wait-mode", choices=["poll", "long_poll", "sse"], default=None)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    os.environ["LLM_API_URL"] = args.url
+    os.environ.setdefault("LLM_API_KEY", "load-test")
+    if args.wait_mode:
+        os.environ["LLM_WAIT_MODE"] = args.wait_mode
+
+    report = {
+        "config": {
+            "url": args.url,
+            "requests_per_level": args.requests,
+            "repeat": args.repeat,
+            "stream": args.stream,
+            "degrade": parse_degrade(args.degrade),
+            "wait_mode": os.environ.get("LLM_WAIT_MODE", "poll"),
+            "max_in_flight": int(os.environ.get("LLM_MAX_IN_FLIGHT", "8"))
+        },
+        "results": asyncio.run(run(args))
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Compare the compiled keyword index with the original keyword scan of find_best_match.
+
+Builds a synthetic knowledge base with --entries topics (each with a handful of
+one- and two-word keywords), generates user questions that mention some of
+them, and reports build time, per-query latency, speedup and how often both
+implementations pick the same entry. The two differ by design where a keyword
+only occurs inside another word ("cafe" in "decaf"); the index requires a word
+start.
+
+    python benchmarks/qa_match_benchmark.py --entries 1000 --queries 5000
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.stats import percentile
+from features.qa_system.keyword_index import KeywordIndex
+
+SYLLABLES = ["ba", "bo", "li", "no", "ra", "ki", "de", "sa", "mu", "te", "lo", "pi", "ga", "ne", "ru", "zo"]
+FILLER = ["do", "you", "have", "is", "there", "a", "the", "for", "my", "kids", "can", "we", "what", "about", "gibt", "es"]
+
+
+def make_word(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(3))
+
+
+def synthetic_database(entries: int, rng: random.Random) -> dict:
+    vocabulary = list({make_word(rng) for _ in range(entries * 4)})
+    database = {}
+    for number in range(entries):
+        keywords = [rng.choice(vocabulary) for _ in range(rng.randint(4, 10))]
+        keywords += [f"{rng.choice(vocabulary)} {rng.choice(vocabulary)}" for _ in range(rng.randint(0, 2))]
+        database[f"topic_{number}"] = {"en": f"Answer {number}", "de": f"Antwort {number}", "keywords": keywords}
+    return database
+
+
+def synthetic_queries(database: dict, count: int, rng: random.Random) -> list:
+    keywords = [keyword for data in database.values() for keyword in data["keywords"]]
+    queries = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(3, 10))]
+        for _ in range(rng.randint(0, 3)):
+            words.insert(rng.randint(0, len(words)), rng.choice(keywords))
+        queries.append(" ".join(words).capitalize() + "?")
+    return queries
+
+
+def scan_best_match(database: dict, user_text: str) -> tuple:
+    # the original find_best_match: substring test of every keyword of every entry
+    user_text_lower = user_text.lower()
+    best_match = None
+    best_score = 0
+
+    for key, data in database.items():
+        score = 0
+        for keyword in data["keywords"]:
+            if keyword.lower() in user_text_lower:
+                score += 1
+
+        if score > best_score:
+            best_score = score
+            best_match = key
+
+    return best_match, best_score
+
+
+def measure(match, queries: list) -> tuple:
+    timings = []
+    results = []
+    for query in queries:
+        started = time.perf_counter()
+        results.append(match(query))
+        timings.append(time.perf_counter() - started)
+    return results, timings
+
+
+def summarize(timings: list) -> dict:
+    return {
+        "mean_us": sum(timings) / len(timings) * 1e6,
+        "p50_us": percentile(timings, 50) * 1e6,
+        "p99_us": percentile(timings, 99) * 1e6
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    database = synthetic_database(args.entries, rng)
+    queries = synthetic_queries(database, args.queries, rng)
+
+    started = time.perf_counter()
+    index = KeywordIndex(database)
+    build_seconds = time.perf_counter() - started
+
+    scan_results, scan_timings = measure(lambda query: scan_best_match(database, query), queries)
+    index_results, index_timings = measure(index.best_match, queries)
+
+    agreement = sum(1 for scan, indexed in zip(scan_results, index_results) if scan == indexed) / len(queries)
+    report = {
+        "entries": args.entries,
+        "keywords": index.keyword_count,
+        "queries": args.queries,
+        "index_build_ms": build_seconds * 1000,
+        "scan": summarize(scan_timings),
+        "index": summarize(index_timings),
+        "speedup": sum(scan_timings) / sum(index_timings),
+        "agreement": agreement
+    }
+
+    print(f"{args.entries} entries: scan {report['scan']['mean_us']:.0f} us/query, "
+          f"index {report['index']['mean_us']:.1f} us/query ({report['speedup']:.0f}x), "
+          f"agreement {agreement:.1%}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Compare fp32 and int8 dynamic-quantized Whisper on a fixed local audio set.
+
+Every audio file in the directory (.ogg, .oga, .wav, .mp3, .m4a, .flac) may have a
+reference transcript next to it with the same name and a .txt extension. For each
+variant the script reports real-time factor, peak resident memory and word error
+rate against the references.
+
+    python benchmarks/quantization_benchmark.py --audio-dir samples/ --model base
+"""
+import argparse
+import json
+import multiprocessing
+import re
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.audio_corpus import load_corpus
+from utils.voice_processor import SAMPLE_RATE, decode_audio, get_model, quantized_model_path, warm_up
+
+
+def normalize_words(text: str) -> list:
+    return re.findall(r"\w+", text.lower())
+
+
+def word_errors(reference: str, hypothesis: str) -> tuple:
+    """Return (edit distance, reference length) at word level."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+
+    return previous[-1], len(ref)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def prepare_quantized(model_size: str) -> str:
+    # build the on-disk int8 cache up front, so the measured run loads it like a restart would
+    get_model(model_size, quantize=True)
+    return quantized_model_path(model_size)
+
+
+def run_variant(model_size: str, quantize: bool, clips: list, threads: int) -> dict:
+    """Runs in a fresh process so memory figures are not mixed between variants."""
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+
+    started = time.perf_counter()
+    model = get_model(model_size, quantize)
+    load_seconds = time.perf_counter() - started
+    warm_up(model)
+
+    audio_seconds = 0.0
+    inference_seconds = 0.0
+    errors = 0
+    reference_words = 0
+    transcripts = {}
+
+    for name, data, reference in clips:
+        audio = decode_audio(data)
+        audio_seconds += audio.shape[0] / SAMPLE_RATE
+
+        started = time.perf_counter()
+        result = model.transcribe(audio, fp16=False, language=None, task="transcribe")
+        inference_seconds += time.perf_counter() - started
+
+        text = result.get("text", "").strip()
+        transcripts[name] = text
+        if reference:
+            clip_errors, clip_words = word_errors(reference, text)
+            errors += clip_errors
+            reference_words += clip_words
+
+    return {
+        "model": model_size,
+        "quantized": quantize,
+        "load_seconds": load_seconds,
+        "audio_seconds": audio_seconds,
+        "inference_seconds": inference_seconds,
+        "real_time_factor": inference_seconds / audio_seconds if audio_seconds else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "wer": errors / reference_words if reference_words else None,
+        "transcripts": transcripts
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio-dir", type=Path, required=True, help="directory with audio files and .txt references")
+    parser.add_argument("--model", default="base", help="Whisper model size")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    clips = load_corpus(args.audio_dir)
+    if not clips:
+        parser.error(f"no audio files found in {args.audio_dir}")
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        print(f"int8 model cache: {pool.submit(prepare_quantized, args.model).result()}", file=sys.stderr)
+
+    variants = []
+    for quantize in (False, True):
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            variants.append(pool.submit(run_variant, args.model, quantize, clips, args.threads).result())
+
+    fp32, int8 = variants
+    report = {
+        "clips": len(clips),
+        "variants": variants,
+        "speedup": fp32["inference_seconds"] / int8["inference_seconds"] if int8["inference_seconds"] else None,
+        "memory_saved_mb": fp32["peak_rss_mb"] - int8["peak_rss_mb"]
+    }
+
+    for variant in variants:
+        wer = f"{variant['wer']:.3f}" if variant["wer"] is not None else "n/a"
+        print(f"{variant['model']:>8} {'int8' if variant['quantized'] else 'fp32'}: "
+              f"RTF {variant['real_time_factor']:.3f}  peak RSS {variant['peak_rss_mb']:.0f} MB  WER {wer}",
+              file=sys.stderr)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
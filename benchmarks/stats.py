@@ -0,0 +1,9 @@
+def percentile(values: list, q: float) -> float:
+    """Linear-interpolated percentile, q in 0..100."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
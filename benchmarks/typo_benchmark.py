@@ -0,0 +1,189 @@
+"""Measure typo-tolerant keyword matching on the per-message hot path.
+
+Takes the keyword vocabulary of the knowledge base (or a synthetic one with
+--entries), puts random typos (insertions, deletions, substitutions, swapped
+letters) into keywords embedded in short messages, and reports how many typos
+are corrected back to the right word, how often correctly spelled everyday
+sentences are changed by mistake, how often a misspelled question still gets the
+same local (BM25) answer as its correct spelling - the path free-text questions
+take in hedged answering - and the latency of the typo correction and of the
+exact keyword index with and without it.
+
+    python benchmarks/typo_benchmark.py --messages 5000
+    python benchmarks/typo_benchmark.py --entries 1000 --messages 5000
+"""
+import argparse
+import json
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.qa_match_benchmark import FILLER, synthetic_database
+from benchmarks.stats import percentile
+from features.qa_system.fuzzy_index import COMMON_WORDS, TypoCorrector
+from features.qa_system.keyword_index import KeywordIndex
+from features.qa_system.knowledge_base import KnowledgeBase, current_knowledge
+from utils.answer_cache import STOPWORDS
+
+# correctly spelled questions a visitor might send; none of them should be changed
+CLEAN_SENTENCES = [
+    "I am looking for the toilets",
+    "We are cooking at home tonight, when do you close?",
+    "Where should parents wait while their children climb?",
+    "Can grandparents visit together with the grandchildren?",
+    "Is there somewhere quiet to change nappies?",
+    "My daughter celebrates her birthday next Saturday",
+    "How expensive are drinks for adults?",
+    "Could somebody help us find our lost jacket?",
+    "Are strollers allowed inside the building?",
+    "Which trampolines are suitable for toddlers?",
+    "Wir suchen einen Parkplatz",
+    "Darf man eigenes Essen mitbringen?",
+    "Wo können Eltern warten, während die Kinder spielen?",
+    "Meine Tochter feiert nächsten Samstag Geburtstag",
+    "Gibt es Steckdosen zum Aufladen vom Handy?",
+    "Wie teuer sind Getränke für Erwachsene?",
+    "Haben Sie Schließfächer für Jacken und Taschen?",
+    "Welche Trampoline sind für Kleinkinder geeignet?",
+    "Können Großeltern zusammen mit den Enkeln kommen?",
+    "Wir möchten morgen Nachmittag vorbeikommen"
+]
+
+
+def vocabulary_of(database: dict) -> set:
+    words = set()
+    for key, data in database.items():
+        words.update(key.split("_"))
+        for keyword in data["keywords"]:
+            words.update(keyword.lower().split())
+    return words
+
+
+def add_typo(word: str, rng: random.Random) -> str:
+    position = rng.randrange(len(word))
+    kind = rng.choice(["insert", "delete", "substitute", "swap"])
+    if kind == "insert":
+        return word[:position] + rng.choice(string.ascii_lowercase) + word[position:]
+    if kind == "delete":
+        return word[:position] + word[position + 1:]
+    if kind == "substitute":
+        return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+    position = min(position, len(word) - 2)
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+def uncorrected_local_answer(knowledge: KnowledgeBase, question: str, language: str = "en"):
+    # what KnowledgeBase.local_answer returns without typo correction
+    matches = knowledge.retriever.search(question, language, k=1)
+    return knowledge.database[matches[0][0]][language] if matches else None
+
+
+def timed(function, items: list) -> tuple:
+    results, timings = [], []
+    for item in items:
+        started = time.perf_counter()
+        results.append(function(item))
+        timings.append(time.perf_counter() - started)
+    return results, timings
+
+
+def summarize(timings: list) -> dict:
+    return {
+        "mean_us": sum(timings) / len(timings) * 1e6,
+        "p50_us": percentile(timings, 50) * 1e6,
+        "p99_us": percentile(timings, 99) * 1e6
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=0, help="synthetic knowledge base size (0 = the real knowledge base)")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    database = synthetic_database(args.entries, rng) if args.entries else current_knowledge().database
+    vocabulary = vocabulary_of(database)
+
+    started = time.perf_counter()
+    if args.entries:
+        corrector = TypoCorrector(vocabulary, set().union(*STOPWORDS.values(), *COMMON_WORDS.values()))
+    else:
+        # the corrector the bot uses, with the answers' own words as known words
+        corrector = current_knowledge().typo_corrector
+    index = KeywordIndex(database)
+    build_seconds = time.perf_counter() - started
+
+    # only words long enough to be corrected get typos; the rest of the message is filler
+    targets = [word for word in vocabulary if corrector.max_distance(word) and word.isalpha()]
+    messages, expected, spelled = [], [], []
+    for _ in range(args.messages):
+        word = rng.choice(targets)
+        misspelled = add_typo(word, rng)
+        words = [rng.choice(FILLER) for _ in range(rng.randint(2, 8))]
+        position = rng.randint(0, len(words))
+        messages.append(" ".join(words[:position] + [misspelled] + words[position:]))
+        spelled.append(" ".join(words[:position] + [word] + words[position:]))
+        expected.append((misspelled, word))
+
+    corrected, correct_timings = timed(corrector.correct, messages)
+    fixed = sum(1 for text, (_, word) in zip(corrected, expected) if word in text.split())
+    # clean messages must come through unchanged: every vocabulary word between filler,
+    # and everyday sentences whose longer words are not in the vocabulary
+    clean = [" ".join(rng.choice(FILLER) for _ in range(4)) + " " + word for word in targets]
+    changed = sum(1 for text in clean if corrector.correct(text) != text)
+    sentences_changed = [sentence for sentence in CLEAN_SENTENCES
+                         if corrector.correct(sentence) != sentence.lower()]
+
+    # local answers: the misspelled question should get the answer its correct spelling gets
+    knowledge = KnowledgeBase(database) if args.entries else current_knowledge()
+    local_pairs = [(message, knowledge.local_answer(text, "en")[0])
+                   for message, text in zip(messages, spelled)]
+    local_pairs = [(message, answer) for message, answer in local_pairs if answer is not None]
+    local_raw = sum(1 for message, answer in local_pairs if uncorrected_local_answer(knowledge, message) == answer)
+    local_corrected = sum(1 for message, answer in local_pairs if knowledge.local_answer(message, "en")[0] == answer)
+
+    exact_results, exact_timings = timed(index.best_match, messages)
+    fuzzy_results, fuzzy_timings = timed(lambda text: index.best_match(corrector.correct(text)), messages)
+
+    report = {
+        "entries": len(database),
+        "vocabulary": len(vocabulary),
+        "messages": args.messages,
+        "build_ms": build_seconds * 1000,
+        "typos_corrected": fixed / len(messages),
+        "clean_messages_changed": changed / len(clean),
+        "clean_sentences_changed": len(sentences_changed) / len(CLEAN_SENTENCES),
+        "changed_sentences": [(sentence, corrector.correct(sentence)) for sentence in sentences_changed],
+        "matched_exact": sum(1 for key, _ in exact_results if key) / len(messages),
+        "matched_with_correction": sum(1 for key, _ in fuzzy_results if key) / len(messages),
+        "local_answer_same_raw": local_raw / max(1, len(local_pairs)),
+        "local_answer_same_with_correction": local_corrected / max(1, len(local_pairs)),
+        "correct_typos": summarize(correct_timings),
+        "match_exact": summarize(exact_timings),
+        "match_with_correction": summarize(fuzzy_timings)
+    }
+
+    print(f"{len(vocabulary)} words: {report['typos_corrected']:.1%} of typos corrected, "
+          f"{report['clean_sentences_changed']:.1%} clean sentences changed, "
+          f"matches {report['matched_exact']:.1%} -> {report['matched_with_correction']:.1%}, "
+          f"local answers {report['local_answer_same_raw']:.1%} -> {report['local_answer_same_with_correction']:.1%}, "
+          f"{report['match_with_correction']['mean_us']:.0f} us/message "
+          f"(p99 {report['match_with_correction']['p99_us']:.0f} us)", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Benchmark the voice pipeline end to end through VoiceProcessor.transcribe_voice.
+
+Drives a local corpus of OGG/Opus clips at a fixed concurrency and reports per-stage
+timings (decode, VAD trimming, inference), real-time factor, throughput and
+p50/p95/p99 latency as JSON, so runs can be compared across model sizes, backends
+and CPU types.
+
+    python benchmarks/voice_benchmark.py --generate-corpus bench_corpus/ --concurrency 8
+    python benchmarks/voice_benchmark.py --corpus bench_corpus/ --model tiny --backend process --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.audio_corpus import generate_corpus, load_corpus
+from benchmarks.stats import percentile
+from utils.voice_processor import SAMPLE_RATE, VoiceProcessor, decode_audio
+
+
+async def run_benchmark(processor: VoiceProcessor, clips: list, requests: int, concurrency: int) -> dict:
+    durations = {name: decode_audio(data).shape[0] / SAMPLE_RATE for name, data, _ in clips}
+
+    started = time.perf_counter()
+    await processor.load()
+    load_seconds = time.perf_counter() - started
+    if not processor.is_ready():
+        raise RuntimeError(f"Whisper model failed to load (state: {processor.state})")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+    audio_seconds = 0.0
+
+    async def one_request(index: int):
+        nonlocal failures, audio_seconds
+        name, data, _ = clips[index % len(clips)]
+        async with semaphore:
+            request_started = time.perf_counter()
+            text, _ = await processor.transcribe_voice(data)
+            latencies.append(time.perf_counter() - request_started)
+        audio_seconds += durations[name]
+        if not text:
+            failures += 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one_request(index) for index in range(requests)))
+    wall_seconds = time.perf_counter() - wall_started
+
+    batching = processor.batcher.get_stats()
+    totals = batching["metric_totals"]
+    inference_seconds = totals.get("tier1_seconds", 0.0) + totals.get("tier2_seconds", 0.0)
+
+    return {
+        "load_seconds": load_seconds,
+        "requests": requests,
+        "failures": failures,
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall_seconds,
+        "throughput": {
+            "requests_per_second": requests / wall_seconds,
+            "audio_seconds_per_second": audio_seconds / wall_seconds
+        },
+        "real_time_factor": inference_seconds / audio_seconds if audio_seconds else None,
+        "latency_ms": {
+            "mean": sum(latencies) / len(latencies) * 1000,
+            "p50": percentile(latencies, 50) * 1000,
+            "p95": percentile(latencies, 95) * 1000,
+            "p99": percentile(latencies, 99) * 1000,
+            "max": max(latencies) * 1000
+        },
+        "stage_ms_per_request": {
+            "queue_wait": batching["avg_wait_ms"],
+            "decode": totals.get("decode_seconds", 0.0) / requests * 1000,
+            "vad": totals.get("vad_seconds", 0.0) / requests * 1000,
+            "inference": inference_seconds / requests * 1000,
+            "inference_tier1": totals.get("tier1_seconds", 0.0) / requests * 1000,
+            "inference_tier2": totals.get("tier2_seconds", 0.0) / requests * 1000
+        },
+        "batching": batching,
+        "cascade": processor.get_cascade_stats(),
+        "vad": processor.get_vad_stats()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    corpus = parser.add_mutually_exclusive_group(required=True)
+    corpus.add_argument("--corpus", type=Path, help="directory with OGG/Opus clips")
+    corpus.add_argument("--generate-corpus", type=Path, help="synthesize a de/en corpus into this directory first")
+    parser.add_argument("--requests", type=int, default=0, help="number of requests (default: 4 per clip)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--backend", choices=["thread", "process"], default="thread")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--torch-threads", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--batch-wait-ms", type=float, default=50.0)
+    parser.add_argument("--cascade-model", default=None)
+    parser.add_argument("--quantize", action="store_true")
+    parser.add_argument("--no-vad", action="store_true")
+    parser.add_argument("--output", type=Path, help="write the JSON report to this file")
+    args = parser.parse_args()
+
+    clips = generate_corpus(args.generate_corpus) if args.generate_corpus else load_corpus(args.corpus)
+    if not clips:
+        parser.error("the corpus is empty")
+
+    config = {
+        "model": args.model,
+        "backend": args.backend,
+        "workers": args.workers if args.backend == "process" else 0,
+        "torch_threads": args.torch_threads or None,
+        "batch_size": args.batch_size,
+        "batch_wait_ms": args.batch_wait_ms,
+        "cascade_model": args.cascade_model,
+        "quantize": args.quantize,
+        "vad": not args.no_vad,
+        "concurrency": args.concurrency,
+        "clips": len(clips)
+    }
+
+    processor = VoiceProcessor(
+        model_size=args.model,
+        batch_size=args.batch_size,
+        batch_wait_ms=args.batch_wait_ms,
+        backend=args.backend,
+        workers=args.workers,
+        torch_threads=args.torch_threads or None,
+        max_queue_size=0,
+        cascade_model_size=args.cascade_model,
+        quantize=args.quantize,
+        vad=not args.no_vad
+    )
+
+    try:
+        results = asyncio.run(run_benchmark(processor, clips, args.requests or 4 * len(clips), args.concurrency))
+    finally:
+        processor.shutdown()
+
+    report = {
+        "config": config,
+        "host": {
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version()
+        },
+        "results": results
+    }
+
+    latency = results["latency_ms"]
+    print(f"{args.model}/{args.backend} x{args.concurrency}: "
+          f"RTF {results['real_time_factor']:.3f}  "
+          f"{results['throughput']['requests_per_second']:.2f} req/s  "
+          f"p50 {latency['p50']:.0f} ms  p95 {latency['p95']:.0f} ms  p99 {latency['p99']:.0f} ms",
+          file=sys.stderr)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import qrcode
 import os
 import logging
 from utils.text_messages import booking_dashboard_de, booking_dashboard_en
+from utils.user_state import user_states
 from pathlib import Path
 
 try:
@@ -15,7 +16,6 @@ except ImportError:
         return "en"
 class BookingFeature:
     def __init__(self):
-        self.booking_sessions = {}
         self.available_slots = {}
 
         self.booking_types = {
@@ -131,10 +131,12 @@ class BookingFeature:
         data = callback_query.data
         user_id = str(callback_query.from_user.id)
 
-        if user_id not in self.booking_sessions:
-            self.booking_sessions[user_id] = {}
+        state = user_states.get_or_create(user_id)
+        if state.booking is None:
+            state.booking = {}
+        session = state.booking
 
-        language = self.booking_sessions[user_id].get("language", "en")
+        language = session.get("language", "en")
 
         try:
             if data == 'booking_main' or data == 'booking_menu':
@@ -143,20 +145,20 @@ class BookingFeature:
                 await callback_query.message.edit_text(text, reply_markup=keyboard)
             
             elif data == "booking_entry":
-                self.booking_sessions[user_id]["type"] = "entry"
-                self.booking_sessions[user_id]["language"] = language
+                session["type"] = "entry"
+                session["language"] = language
                 keyboard = self.get_entry_ticket_keyboard(language)
                 text = "🎫 Eintrittskarten wählen:" if language == "de" else "🎫 Choose Entry Tickets:"
                 await callback_query.message.edit_text(text, reply_markup=keyboard)
             
             elif data.startswith("entry_"):
                 ticket_type = data.replace("entry_", "")
-                self.booking_sessions[user_id]["subtype"] = ticket_type
+                session["subtype"] = ticket_type
 
                 if ticket_type == "group":
                     text = "👥 Wie viele Personen? (Mindestens 10)" if language == "de" else "👥 How many people? (Minimum 10)"
                     await callback_query.message.edit_text(text)
-                    self.booking_sessions[user_id]["waiting_for"] = "group_size"
+                    session["waiting_for"] = "group_size"
                 else:
                     keyboard = self.get_calendar_keyboard(language)
                     text = "📅 Datum wählen:" if language == "de" else "📅 Choose Date:"
@@ -164,7 +166,7 @@ class BookingFeature:
 
             elif data.startswith("date_"):
                 date = data.replace("date_", "")
-                self.booking_sessions[user_id]["date"] = date
+                session["date"] = date
                 keyboard = self.get_time_slots_keyboard(date, language)
                 text = f"🕐 Zeitslot für {date} wählen:" if language == "de" else f"🕐 Choose Time Slot for {date}:"
                 await callback_query.message.edit_text(text, reply_markup=keyboard)
@@ -173,7 +175,7 @@ class BookingFeature:
                 parts = data.replace("time_", "").split("_")
                 date = parts[0]
                 time_slot = "_".join(parts[1:])
-                self.booking_sessions[user_id]["time"] = time_slot
+                session["time"] = time_slot
                 
                 # Generate booking confirmation
                 await self.generate_booking_confirmation(callback_query, bot, user_id, language)
@@ -208,8 +210,10 @@ class BookingFeature:
         text = message.text.lower()
         language = detect_language(message.text)
         
-        if user_id in self.booking_sessions and "waiting_for" in self.booking_sessions[user_id]:
-            if self.booking_sessions[user_id]["waiting_for"] == "group_size":
+        state = user_states.get(user_id)
+        session = state.booking if state is not None else None
+        if session and "waiting_for" in session:
+            if session["waiting_for"] == "group_size":
                 try:
                     group_size = int(message.text)
                     if group_size < 10:
@@ -217,8 +221,8 @@ class BookingFeature:
                         await message.reply(error_msg)
                         return
                     
-                    self.booking_sessions[user_id]["group_size"] = group_size
-                    del self.booking_sessions[user_id]["waiting_for"]
+                    session["group_size"] = group_size
+                    del session["waiting_for"]
                     
                     keyboard = self.get_calendar_keyboard(language)
                     text = "📅 Datum wählen:" if language == "de" else "📅 Choose Date:"
@@ -254,7 +258,7 @@ class BookingFeature:
     
     async def generate_booking_confirmation(self, callback_query: types.CallbackQuery, bot: Bot, user_id: str, language: str):
         try:
-            session = self.booking_sessions[user_id]
+            session = user_states.get_or_create(user_id).booking
             
             booking_type = session.get("type", "entry")
             subtype = session.get("subtype", "individual")
@@ -319,8 +323,9 @@ class BookingFeature:
                     if os.path.exists(qr_path):
                         os.remove(qr_path)
             
-            if user_id in self.booking_sessions:
-                del self.booking_sessions[user_id]
+            state = user_states.get(user_id)
+            if state is not None:
+                state.booking = None
                 
         except Exception as e:
             logging.error(f"Error generating booking confirmation: {e}")
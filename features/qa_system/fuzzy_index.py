@@ -0,0 +1,114 @@
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set
+
+# Everyday words that are one edit away from a keyword ("looking" / "booking",
+# "suchen" / "buchen"). They are real words, so they are never corrected.
+COMMON_WORDS = {
+    "en": {
+        "about", "after", "again", "allowed", "always", "another", "anything", "around", "because",
+        "before", "bring", "bringing", "child", "children", "clean", "close", "closed", "cooking",
+        "could", "daughter", "during", "every", "family", "finding", "first", "friday",
+        "friends", "going", "great", "happy", "heating", "hello", "holding", "hosting", "hours",
+        "house", "looking", "making", "maybe", "money", "monday", "morning", "night", "nothing",
+        "other", "outside", "parent", "parents", "parking", "people", "place", "please", "price",
+        "prices", "really", "right", "saturday", "should", "since", "something", "spare", "still",
+        "sunday", "thank", "thanks", "their", "there", "these", "thing", "things", "think", "those",
+        "thursday", "today", "toilet", "toilets", "tomorrow", "tuesday", "under", "until", "visit",
+        "visiting", "wanted", "water", "wednesday", "weekend", "where", "which", "while", "would"
+    },
+    "de": {
+        "abends", "alles", "andere", "bringen", "danke", "dürfen", "eltern", "essen",
+        "freitag", "freunde", "geben", "gehen", "gerne", "heute", "immer", "kinder", "kindern",
+        "kommen", "können", "lachen", "lassen", "machen", "montag", "morgen", "möchte", "möchten",
+        "nachmittag", "parken", "parkplatz", "preis", "preise", "sagen", "samstag", "sehen",
+        "sollen", "sonntag", "suchen", "toilette", "toiletten", "warum", "welche", "wochenende",
+        "wollen", "würde", "zeigen", "zusammen"
+    }
+}
+
+
+def trigrams(word: str) -> Set[str]:
+    padded = f"${word}$"
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> Optional[int]:
+    """Edit distance of ``a`` and ``b`` if it is at most ``limit``, else None.
+
+    Insertions, deletions, substitutions and swaps of neighbouring letters
+    ("saftey") cost one edit each. Only the diagonal band of width
+    2 * limit + 1 is computed, and the loop stops as soon as a whole row
+    exceeds the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+
+    big = limit + 1
+    before = None
+    previous = [column if column <= limit else big for column in range(len(b) + 1)]
+    for row in range(1, len(a) + 1):
+        current = [big] * (len(b) + 1)
+        if row <= limit:
+            current[0] = row
+        for column in range(max(1, row - limit), min(len(b), row + limit) + 1):
+            value = min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (a[row - 1] != b[column - 1])
+            )
+            if before is not None and column > 1 and a[row - 1] == b[column - 2] and a[row - 2] == b[column - 1]:
+                value = min(value, before[column - 2] + 1)
+            current[column] = min(value, big)
+        if min(current) > limit:
+            return None
+        before, previous = previous, current
+
+    return previous[-1] if previous[-1] <= limit else None
+
+
+class TypoCorrector:
+    """Maps misspelled words to known vocabulary through a character-trigram index.
+
+    Candidates are the vocabulary words sharing the most trigrams with a word;
+    only those within a bounded edit distance are accepted. Short words and
+    ``known_words`` are left alone, since one edit turns them into too many
+    other words.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], known_words: Iterable[str] = (), max_candidates: int = 8):
+        self.max_candidates = max_candidates
+        self.words: List[str] = sorted({word for word in vocabulary if word})
+        # correctly spelled words that are not correction targets, e.g. COMMON_WORDS
+        self._known = set(self.words) | set(known_words)
+        self._postings: Dict[str, List[int]] = {}
+        for position, word in enumerate(self.words):
+            for gram in trigrams(word):
+                self._postings.setdefault(gram, []).append(position)
+
+    @staticmethod
+    def max_distance(word: str) -> int:
+        if len(word) < 5:
+            return 0
+        return 1 if len(word) < 9 else 2
+
+    def correct_word(self, word: str) -> str:
+        limit = self.max_distance(word)
+        if not limit or word in self._known or not word.isalpha():
+            return word
+
+        shared = Counter()
+        for gram in trigrams(word):
+            shared.update(self._postings.get(gram, ()))
+
+        best, best_distance = word, limit + 1
+        for position, _ in shared.most_common(self.max_candidates):
+            candidate = self.words[position]
+            distance = bounded_edit_distance(word, candidate, limit)
+            if distance is not None and distance < best_distance:
+                best, best_distance = candidate, distance
+        return best
+
+    def correct(self, text: str) -> str:
+        """Return ``text`` (lower-cased) with every correctable word replaced."""
+        return re.sub(r"\w+", lambda match: self.correct_word(match.group(0)), text.lower())
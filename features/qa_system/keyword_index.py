@@ -0,0 +1,72 @@
+from typing import Dict, List, Optional, Tuple
+
+# marks the end of a keyword in the trie; cannot collide with a character of the text
+_END = ""
+
+
+class KeywordIndex:
+    """All QA keywords compiled into one character trie.
+
+    Keywords are matched where a word starts in the user text and may run on
+    into a longer word, so "open" matches "opening" and "rollstuhl" matches
+    "Rollstuhlzugang", but "cafe" no longer matches inside "decaf". Every word
+    start walks the trie once, so the cost depends on the length of the text
+    and the longest keyword, not on how many entries or keywords there are.
+    """
+
+    def __init__(self, database: dict):
+        self.keys: List[str] = list(database)
+        self._root: dict = {}
+        self.keyword_count = 0
+
+        for position, key in enumerate(self.keys):
+            weights: Dict[str, int] = {}
+            for keyword in database[key].get("keywords", []):
+                keyword = keyword.lower()
+                if keyword:
+                    # a keyword listed twice for an entry counts twice, like the plain scan did
+                    weights[keyword] = weights.get(keyword, 0) + 1
+
+            for keyword, weight in weights.items():
+                node = self._root
+                for character in keyword:
+                    node = node.setdefault(character, {})
+                node.setdefault(_END, []).append((position, self.keyword_count, weight))
+                self.keyword_count += 1
+
+    def scores(self, text: str) -> Dict[int, int]:
+        """Return entry position -> score for every entry with at least one keyword in ``text``."""
+        text = text.lower()
+        length = len(text)
+        matched = set()
+        previous_is_word = False
+
+        for start, character in enumerate(text):
+            is_word = character.isalnum()
+            if is_word and not previous_is_word:
+                node = self._root
+                index = start
+                while index < length:
+                    node = node.get(text[index])
+                    if node is None:
+                        break
+                    matched.update(node.get(_END, ()))
+                    index += 1
+            previous_is_word = is_word
+
+        scores: Dict[int, int] = {}
+        # the same keyword found twice in the text still counts once
+        for position, _, weight in matched:
+            scores[position] = scores.get(position, 0) + weight
+        return scores
+
+    def best_match(self, text: str) -> Tuple[Optional[str], int]:
+        """Return the best scoring entry key and its score; ties go to the entry listed first."""
+        best_position, best_score = None, 0
+        for position, score in self.scores(text).items():
+            if score > best_score or (score == best_score and best_position is not None and position < best_position):
+                best_position, best_score = position, score
+
+        if best_position is None:
+            return None, 0
+        return self.keys[best_position], best_score
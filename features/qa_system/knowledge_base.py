@@ -0,0 +1,209 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from utils.answer_cache import STOPWORDS
+from .fuzzy_index import COMMON_WORDS, TypoCorrector
+from .keyword_index import KeywordIndex
+from .qa_retrieval import QARetriever, load_token_encoding, tokenize
+
+# PyYAML is optional: without it only JSON knowledge base files can be loaded
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+DEFAULT_DATABASE_PATH = str(Path(__file__).parent / "qa_database.json")
+
+WELCOME_BACK = {"en": "Welcome back! 👋", "de": "Willkommen zurück! 👋"}
+
+
+def load_database(path: str) -> dict:
+    """Read and validate a knowledge base file (JSON, or YAML if PyYAML is installed)."""
+    with open(path, encoding="utf-8") as file:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise ValueError("PyYAML is not installed - cannot read a YAML knowledge base")
+            database = yaml.safe_load(file)
+        else:
+            database = json.load(file)
+
+    if not isinstance(database, dict) or not database:
+        raise ValueError("the knowledge base must be a non-empty mapping of topic -> entry")
+    for key, data in database.items():
+        if not isinstance(data, dict) or not isinstance(data.get("keywords"), list):
+            raise ValueError(f"entry {key!r} needs a list of keywords")
+        for field, value in data.items():
+            if field != "keywords" and not isinstance(value, str):
+                raise ValueError(f"entry {key!r}: the {field!r} answer must be text")
+    return database
+
+
+class KnowledgeBase:
+    """One loaded version of the knowledge base and everything derived from it.
+
+    The keyword trie, the typo corrector, the BM25 retriever and the rendered
+    answers are built together and never changed afterwards, so a request that
+    takes a snapshot once sees one consistent version even if the file is
+    reloaded while it runs.
+    """
+
+    def __init__(self, database: dict, source: Optional[str] = None, mtime: Optional[int] = None):
+        self.database = database
+        self.source = source
+        self.mtime = mtime
+        self.loaded_at = time.time()
+
+        self.keyword_index = KeywordIndex(database)
+        self.retriever = QARetriever(database)
+        self.fingerprint = self.retriever.fingerprint
+
+        words = set()
+        # real words that must not be "corrected" into a keyword: the answers' own words and everyday language
+        known = set().union(*STOPWORDS.values(), *COMMON_WORDS.values())
+        for key, data in database.items():
+            words.update(key.split("_"))
+            for field, value in data.items():
+                if field == "keywords":
+                    for keyword in value:
+                        words.update(keyword.lower().split())
+                else:
+                    known.update(tokenize(value))
+        self.typo_corrector = TypoCorrector(words, known)
+
+        # (key, language, returning user) -> answer text, greeting included
+        self.responses: Dict[Tuple[str, str, bool], str] = {}
+        for key, data in database.items():
+            for language, text in data.items():
+                if language == "keywords":
+                    continue
+                self.responses[key, language, False] = text
+                if language in WELCOME_BACK:
+                    self.responses[key, language, True] = f"{WELCOME_BACK[language]}\n\n{text}"
+
+        # language -> system prompt without a question, rendered on first use
+        self.prompts: Dict[str, str] = {}
+
+    def correct_typos(self, text: str) -> str:
+        return self.typo_corrector.correct(text)
+
+    def best_match(self, text: str) -> Tuple[Optional[str], int]:
+        return self.keyword_index.best_match(self.correct_typos(text))
+
+    def response(self, key: str, language: str, returning: bool = False) -> Optional[str]:
+        return self.responses.get((key, language, returning)) or self.responses.get((key, language, False))
+
+    def local_answer(self, question: str, language: str) -> Tuple[Optional[str], float, int]:
+        """Answer from the knowledge base with a calibrated confidence in 0..1 and the
+        number of question words the answer's section contains, or (None, 0.0, 0).
+
+        Typos are corrected first, so "rollstul" finds the wheelchair answer.
+        """
+        matches = self.retriever.search(self.correct_typos(question), language, k=1)
+        if not matches:
+            return None, 0.0, 0
+
+        key, confidence, matched = matches[0]
+        return self.database[key][language], confidence, matched
+
+
+_current: Optional[KnowledgeBase] = None
+# file version of the last load attempt, successful or not
+_attempted_version: Optional[int] = None
+# serializes rebuilds; readers never take it, they just use the snapshot they got
+_rebuild_lock = threading.Lock()
+_reload_stats = {"reloads": 0, "failed": 0, "last_reload_ms": 0.0}
+
+
+def _file_version(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def database_path() -> str:
+    # read on every load, not at import: main.py imports this module before load_dotenv() runs
+    return os.getenv("QA_DATABASE_PATH") or DEFAULT_DATABASE_PATH
+
+
+def current_knowledge() -> KnowledgeBase:
+    """Return the current snapshot; take it once per request and use it throughout."""
+    if _current is None:
+        reload_knowledge(force=True)
+    return _current
+
+
+def reload_knowledge(force: bool = False) -> bool:
+    """Rebuild the snapshot if the knowledge base file changed; return whether it was swapped.
+
+    A file that cannot be read or is invalid is logged and the previous
+    snapshot stays in use; on first load the error is raised instead.
+    """
+    global _current, _attempted_version
+
+    with _rebuild_lock:
+        path = database_path()
+        mtime = _file_version(path)
+        if not force and _current is not None and mtime == _attempted_version:
+            return False
+        # a broken version is not retried until the file changes again
+        _attempted_version = mtime
+
+        started = time.perf_counter()
+        try:
+            snapshot = KnowledgeBase(load_database(path), path, mtime)
+        except (OSError, ValueError) as e:
+            if _current is None:
+                raise
+            _reload_stats["failed"] += 1
+            logging.error(f"Knowledge base {path} not reloaded, keeping the previous version: {e}")
+            return False
+
+        changed = _current is None or snapshot.fingerprint != _current.fingerprint
+        _current = snapshot
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _reload_stats["reloads"] += 1
+        _reload_stats["last_reload_ms"] = elapsed_ms
+        logging.info(f"Knowledge base loaded from {path}: {len(snapshot.database)} entries "
+                     f"in {elapsed_ms:.1f} ms{'' if changed else ' (content unchanged)'}")
+        return True
+
+
+async def warm_up_knowledge():
+    """Background task: load the tokenizer, then build the knowledge base, both in worker threads.
+
+    The tokenizer may have to be downloaded on first start; until it is
+    ready prompt tokens are estimated, and a snapshot built before that is
+    rebuilt here with exact section token counts.
+    """
+    await asyncio.to_thread(load_token_encoding)
+    await asyncio.to_thread(reload_knowledge, True)
+
+
+async def watch_knowledge_base(interval_seconds: float):
+    """Background task: check the knowledge base file every ``interval_seconds`` and reload it when it changed.
+
+    The new snapshot is built in a worker thread, so answering goes on with
+    the old one until the swap.
+    """
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if _file_version(database_path()) != _attempted_version:
+            await asyncio.to_thread(reload_knowledge)
+
+
+def get_knowledge_stats() -> dict:
+    knowledge = current_knowledge()
+    return {
+        "source": knowledge.source,
+        "entries": len(knowledge.database),
+        "fingerprint": knowledge.fingerprint[:12],
+        "loaded_at": knowledge.loaded_at,
+        **_reload_stats
+    }
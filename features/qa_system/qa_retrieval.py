@@ -0,0 +1,219 @@
+import hashlib
+import json
+import logging
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from utils.answer_cache import STOPWORDS
+
+# scipy is optional: without it the term weights are kept as NumPy posting arrays
+try:
+    from scipy import sparse
+except ImportError:
+    sparse = None
+
+# tiktoken ships with openai-whisper; without it token counts are estimated
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# set by load_token_encoding(); token counts are estimated until then
+_encoding = None
+
+
+def load_token_encoding() -> bool:
+    """Load the tokenizer used for exact prompt token counts; return whether it is available.
+
+    On first start tiktoken downloads the BPE file, so this blocks and must
+    run in a worker thread, never at import or on the event loop.
+    """
+    global _encoding
+
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:  # the BPE file cannot be downloaded
+            logging.getLogger(__name__).warning(f"tiktoken encoding unavailable - estimating prompt tokens from text length: {e}")
+    elif tiktoken is None:
+        logging.getLogger(__name__).warning("tiktoken unavailable - estimating prompt tokens from text length")
+    return _encoding is not None
+
+
+def count_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"\w+", text.casefold())
+
+
+def knowledge_fingerprint(database: dict) -> str:
+    return hashlib.sha1(json.dumps(database, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class QARetriever:
+    """Vectorized BM25 over knowledge base sections.
+
+    Every section is indexed per language from its title, keywords and answer
+    text. The BM25 weight of every (section, term) pair is precomputed into a
+    sparse sections x terms matrix (scipy.sparse when installed, otherwise
+    per-term NumPy posting arrays), so scoring a question is a sparse dot
+    product with its term counts. Section texts and their token counts are
+    computed once as well, so building a prompt only ranks and sums.
+    """
+
+    def __init__(self, database: dict, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.fingerprint = knowledge_fingerprint(database)
+
+        # language -> list of (key, section text, token count)
+        self._sections: Dict[str, List[Tuple[str, str, int]]] = {}
+        self._vocabulary: Dict[str, Dict[str, int]] = {}
+        self._idf: Dict[str, np.ndarray] = {}
+        self._max_idf: Dict[str, float] = {}
+        self._weights: Dict[str, object] = {}
+        self._postings: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+
+        languages = {language for data in database.values() for language in data if language != "keywords"}
+        for language in languages:
+            self._index_language(database, language)
+
+    def _index_language(self, database: dict, language: str):
+        sections = []
+        documents = []
+        for key, data in database.items():
+            if language not in data:
+                continue
+            title = key.replace("_", " ").title()
+            text = f"{title}:\n{data[language]}"
+            sections.append((key, text, count_tokens(text)))
+            documents.append(Counter(tokenize(f"{title} {' '.join(data.get('keywords', []))} {data[language]}")))
+
+        vocabulary: Dict[str, int] = {}
+        rows, columns, frequencies = [], [], []
+        for row, terms in enumerate(documents):
+            for term, frequency in terms.items():
+                rows.append(row)
+                columns.append(vocabulary.setdefault(term, len(vocabulary)))
+                frequencies.append(frequency)
+
+        rows = np.array(rows, dtype=np.int32)
+        columns = np.array(columns, dtype=np.int32)
+        frequencies = np.array(frequencies, dtype=np.float32)
+        count = len(sections)
+
+        lengths = np.array([sum(terms.values()) for terms in documents], dtype=np.float32)
+        avg_length = float(lengths.mean()) if count else 1.0
+        document_frequency = np.bincount(columns, minlength=len(vocabulary)).astype(np.float32)
+        idf = np.log1p((count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        # BM25 weight of each (section, term) pair; a question term adds its weight once per occurrence
+        norm = self.k1 * (1 - self.b + self.b * lengths[rows] / (avg_length or 1.0))
+        weights = idf[columns] * frequencies * (self.k1 + 1) / (frequencies + norm)
+
+        self._sections[language] = sections
+        self._vocabulary[language] = vocabulary
+        self._idf[language] = idf
+        self._max_idf[language] = float(math.log1p((count + 0.5) / 1.5)) if count else 0.0
+
+        if sparse is not None:
+            self._weights[language] = sparse.csr_matrix((weights, (rows, columns)), shape=(count, len(vocabulary)))
+        else:
+            order = np.argsort(columns, kind="stable")
+            bounds = np.searchsorted(columns[order], np.arange(len(vocabulary) + 1))
+            self._postings[language] = [
+                (rows[order[bounds[term]:bounds[term + 1]]], weights[order[bounds[term]:bounds[term + 1]]])
+                for term in range(len(vocabulary))
+            ]
+
+    def _scores(self, question: str, language: str) -> Tuple[np.ndarray, float, List[int]]:
+        """Return raw BM25 scores of all sections, the best score the question could reach and the known term ids."""
+        sections = self._sections.get(language, [])
+        vocabulary = self._vocabulary.get(language, {})
+        # stopwords neither score nor count towards the ceiling
+        stopwords = STOPWORDS.get(language, STOPWORDS["en"])
+        terms = [term for term in tokenize(question) if term not in stopwords]
+        known = [vocabulary[term] for term in terms if term in vocabulary]
+
+        # the ceiling is the most each meaningful question word can add to any section:
+        # BM25 saturates at idf * (k1 + 1) however often a short section repeats it, so
+        # one repeated word cannot make an off-topic question confident. Unknown words
+        # count with the highest idf, so a question mostly about things the knowledge
+        # base never mentions cannot be a confident match either
+        idf = self._idf.get(language)
+        ceiling = (self.k1 + 1) * sum(float(idf[vocabulary[term]]) if term in vocabulary
+                                      else self._max_idf.get(language, 0.0) for term in terms)
+
+        if not known:
+            return np.zeros(len(sections), dtype=np.float32), ceiling, known
+        if sparse is not None:
+            query = np.bincount(known, minlength=len(vocabulary)).astype(np.float32)
+            return self._weights[language] @ query, ceiling, known
+
+        scores = np.zeros(len(sections), dtype=np.float32)
+        for term in known:
+            section_rows, weights = self._postings[language][term]
+            scores[section_rows] += weights
+        return scores, ceiling, known
+
+    def _matched_terms(self, language: str, terms: List[int], row: int) -> int:
+        """Count the distinct question terms that occur in section ``row``."""
+        if sparse is not None:
+            weights = self._weights[language]
+            return sum(1 for term in set(terms) if weights[row, term] > 0)
+        return sum(1 for term in set(terms) if row in self._postings[language][term][0])
+
+    def search(self, question: str, language: str, k: int = 3) -> List[Tuple[str, float, int]]:
+        """Return up to ``k`` (section key, confidence, matched terms) with a positive score, best first.
+
+        The confidence is the BM25 score divided by the most the question's
+        meaningful words could score in any section, so it lies in 0..1 and is
+        comparable across questions of different length. A word that occurs
+        once in a section of average length contributes 0.4 of its share.
+        """
+        scores, ceiling, known = self._scores(question, language)
+        if not ceiling or not scores.size:
+            return []
+
+        top = np.argsort(-scores, kind="stable")[:k]
+        sections = self._sections[language]
+        return [(sections[index][0], min(1.0, float(scores[index]) / ceiling), self._matched_terms(language, known, index))
+                for index in top if scores[index] > 0]
+
+    def rank(self, question: str, language: str) -> List[Tuple[str, str, int, float]]:
+        """Return (key, section text, tokens, score) for every section, best match first."""
+        scores, _, _ = self._scores(question, language)
+        # stable sort keeps knowledge base order among equally scored sections
+        order = np.argsort(-scores, kind="stable")
+        sections = self._sections.get(language, [])
+        return [(*sections[index], float(scores[index])) for index in order]
+
+    def select(self, question: str, language: str, token_budget: int) -> Tuple[List[str], int]:
+        """Pick the most relevant sections that fit in ``token_budget`` tokens.
+
+        If nothing matches the question, sections are taken in database order so
+        the LLM still gets as much of the knowledge base as the budget allows.
+        """
+        candidates = [(text, tokens) for _, text, tokens, score in self.rank(question, language) if score > 0]
+        if not candidates:
+            candidates = [(text, tokens) for _, text, tokens in self._sections.get(language, [])]
+
+        texts = []
+        used = 0
+        for text, tokens in candidates:
+            if used + tokens > token_budget:
+                continue
+            texts.append(text)
+            used += tokens
+        return texts, used
+
+    def section_count(self, language: str) -> int:
+        return len(self._sections.get(language, []))
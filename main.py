@@ -3,6 +3,7 @@ import logging
 import os
 import sys
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
 
 project_root = Path(__file__).parent
@@ -15,15 +16,19 @@ from aiogram.enums import ParseMode
 from aiogram.client.default import DefaultBotProperties
 
 from utils.language import detect_language
+from features.qa_system.knowledge_base import warm_up_knowledge, watch_knowledge_base
 from features.qa_system.qa_data import get_enhanced_response
 from features.accessibility.accessibility_feature import AccessibilityFeature
 from features.booking_system.booking_feature import BookingFeature
 from utils.text_messages import (
     welcome_text_de, welcome_text_en, help_text_en, help_text_de, 
     contact_text_de, contact_text_en, voice_response_de, voice_response_en,
-    location_response_de, location_response_en
+    voice_busy_de, voice_busy_en, location_response_de, location_response_en
 )
-from utils.voice_processor import VoiceProcessor
+from utils.voice_processor import VoiceProcessor, TRANSCRIPTION_BUSY
+from utils.transcription_cache import TranscriptionCache
+from utils.question_sketch import QuestionTracker, parse_hours, pregenerate_answers
+from utils.user_state import user_states
 
 logging.basicConfig(
     level=logging.INFO,
@@ -34,14 +39,80 @@ load_dotenv()
 
 # Bot configuration
 BOT_TOKEN = os.getenv('BOT_TOKEN')
-if not BOT_TOKEN:
-    raise ValueError("BOT_TOKEN not found in environment variables")
 BOT_NAME = os.getenv('BOT_NAME', 'BambolinoBot')
 
-bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN))
 dp = Dispatcher()
 router = Router()
-voice_processor = VoiceProcessor()
+# how long a voice message waits for the background Whisper warm-up
+VOICE_READY_TIMEOUT = float(os.getenv('WHISPER_READY_TIMEOUT', '20'))
+# minimum seconds between progressive edits of the voice status message
+VOICE_EDIT_INTERVAL = float(os.getenv('VOICE_EDIT_INTERVAL', '1.5'))
+# minimum seconds between edits while an LLM answer is streamed
+LLM_EDIT_INTERVAL = float(os.getenv('LLM_EDIT_INTERVAL', '1.0'))
+
+# created by setup() when the bot starts, not at import: the "spawn" transcription
+# workers import this module as __mp_main__ and must not build a bot, open the
+# transcription cache or load the question sketch
+bot: Optional[Bot] = None
+voice_processor: Optional[VoiceProcessor] = None
+transcription_cache: Optional[TranscriptionCache] = None
+question_tracker: Optional[QuestionTracker] = None
+
+
+def setup():
+    """Create the bot and the services its handlers use, configured from the environment."""
+    global bot, voice_processor, transcription_cache, question_tracker
+
+    if not BOT_TOKEN:
+        raise ValueError("BOT_TOKEN not found in environment variables")
+
+    bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN))
+    voice_processor = VoiceProcessor(
+        model_size=os.getenv('WHISPER_MODEL', 'base'),
+        batch_size=int(os.getenv('WHISPER_BATCH_SIZE', '8')),
+        batch_wait_ms=float(os.getenv('WHISPER_BATCH_WAIT_MS', '50')),
+        backend=os.getenv('WHISPER_BACKEND', 'thread'),
+        workers=int(os.getenv('WHISPER_WORKERS', '2')),
+        torch_threads=int(os.getenv('WHISPER_TORCH_THREADS', '0')) or None,
+        max_queue_size=int(os.getenv('WHISPER_MAX_QUEUE', '32')),
+        cascade_model_size=os.getenv('WHISPER_CASCADE_MODEL') or None,
+        quantize=os.getenv('WHISPER_QUANTIZE', 'false').lower() == 'true',
+        vad=os.getenv('WHISPER_VAD', 'true').lower() == 'true',
+        max_seconds=float(os.getenv('WHISPER_MAX_SECONDS', '120')) or None
+    )
+    transcription_cache = TranscriptionCache(
+        max_entries=int(os.getenv('VOICE_CACHE_SIZE', '1024')),
+        db_path=os.getenv('VOICE_CACHE_DB', str(project_root / 'transcription_cache.sqlite3')) or None,
+        ttl_seconds=float(os.getenv('VOICE_CACHE_TTL_HOURS', '168')) * 3600
+    )
+    # per-user state shared by all features; the store exists before .env is loaded
+    user_states.configure(
+        max_users=int(os.getenv('USER_STATE_MAX_USERS', '10000')),
+        idle_ttl_seconds=float(os.getenv('USER_STATE_IDLE_DAYS', '30')) * 86400,
+        memory_budget_bytes=int(float(os.getenv('USER_STATE_MEMORY_MB', '16')) * 1024 * 1024) or None
+    )
+    # most frequent LLM questions, answered ahead of time in off-peak hours
+    question_tracker = QuestionTracker(
+        top_k=int(os.getenv('LLM_PREGENERATE_TOP_K', '20')),
+        width=int(os.getenv('QUESTION_SKETCH_WIDTH', '2048')),
+        path=os.getenv('QUESTION_SKETCH_PATH', str(project_root / 'question_sketch.json')) or None
+    )
+
+# keywords that route a message straight to a feature instead of the LLM
+BOOKING_KEYWORDS = [
+    "book", "booking", "reserve", "reservation", "ticket",
+    "buchen", "buchung", "reservierung", "ticket", "eintrittskarte"
+]
+
+ACCESSIBILITY_KEYWORDS = [
+    "accessibility", "disabled", "wheelchair", "barrierefreiheit",
+    "behindert", "rollstuhl", "autism", "autismus", "sensory", "sensorisch"
+]
+
+QA_KEYWORDS = [
+    "öffnungszeiten", "opening hours", "einrichtungen", "facilities",
+    "café", "cafe", "sicherheit", "safety", "vegetarisch", "vegetarian"
+]
 
 # Initialize features
 booking_feature = BookingFeature()
@@ -116,8 +187,10 @@ def get_quick_response_keyboard(language: str = "en")-> InlineKeyboardMarkup:
     
     return keyboard
 
-# user language preference
-user_languages ={}
+# user language preference, kept in the shared per-user state store
+def get_user_language(user_id: int) -> str:
+    state = user_states.get(user_id)
+    return state.language if state is not None else "en"
 
 @router.message(CommandStart())
 async def start_command(message: types.Message):
@@ -126,7 +199,7 @@ async def start_command(message: types.Message):
     user_language_code = message.from_user.language_code
     language = "de" if user_language_code and user_language_code.startswith("de") else "en"
     
-    user_languages[user_id] = language
+    user_states.get_or_create(user_id).language = language
     
     if language == "de":
         welcome_text=welcome_text_de
@@ -139,7 +212,7 @@ async def start_command(message: types.Message):
 @router.message(Command("help"))
 async def help_command(message: types.Message):
     user_id = message.from_user.id
-    language = user_languages.get(user_id,'en')
+    language = get_user_language(user_id)
 
     if language=='de':
         help_text=help_text_de
@@ -152,7 +225,7 @@ async def help_command(message: types.Message):
 @router.callback_query(F.data=="main_menu")
 async def main_menu_callback(callback: types.CallbackQuery):
     user_id=callback.from_user.id
-    language = user_languages.get(user_id, "en")
+    language = get_user_language(user_id)
     
     text = "🏠 Hauptmenü" if language == "de" else "🏠 Main Menu"
     keyboard = get_main_menu_keyboard(language)
@@ -165,7 +238,7 @@ async def main_menu_callback(callback: types.CallbackQuery):
 async def language_callback(callback: types.CallbackQuery):
     user_id = callback.from_user.id
     new_language = callback.data.split("_")[1]
-    user_languages[user_id] = new_language
+    user_states.get_or_create(user_id).language = new_language
 
     text = "🏠 Hauptmenü" if new_language == "de" else "🏠 Main Menu"
     keyboard = get_main_menu_keyboard(new_language)
@@ -176,7 +249,7 @@ async def language_callback(callback: types.CallbackQuery):
 @router.callback_query(F.data == "qa_menu")
 async def qa_menu_callback(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    language = user_languages.get(user_id, "en")
+    language = get_user_language(user_id)
 
     text = "❓ Fragen & Antworten\n\nWählen Sie ein Thema:" if language == "de" else "❓ Q&A\n\nChoose a topic:"
     keyboard = get_quick_response_keyboard(language)
@@ -187,7 +260,7 @@ async def qa_menu_callback(callback: types.CallbackQuery):
 @router.callback_query(F.data.startswith("qa_"))
 async def qa_callback(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    language = user_languages.get(user_id, "en")
+    language = get_user_language(user_id)
     topic = callback.data.replace("qa_", "")
     
     # Map topics to search terms
@@ -210,14 +283,10 @@ async def qa_callback(callback: types.CallbackQuery):
 async def booking_callback(callback: types.CallbackQuery):
     user_id = callback.from_user.id
     
-    if user_id in user_languages:
-        language = user_languages[user_id]
-        if user_id not in booking_feature.booking_sessions:
-            booking_feature.booking_sessions[user_id] = {}
-        booking_feature.booking_sessions[user_id]["language"] = language
-    else:
-        user_languages[user_id] = "en"
-        booking_feature.booking_sessions[user_id] = {"language": "en"}
+    state = user_states.get_or_create(user_id)
+    if state.booking is None:
+        state.booking = {}
+    state.booking["language"] = state.language
     
     logger.info(f"Processing booking callback: {callback.data} from user {user_id}")
     
@@ -225,14 +294,14 @@ async def booking_callback(callback: types.CallbackQuery):
         await booking_feature.handle_booking_callback(callback, bot)
     except Exception as e:
         logger.error(f"Error in booking callback handler: {e}")
-        error_text = "❌ Ein Fehler ist aufgetreten. Bitte versuchen Sie es erneut." if user_languages.get(user_id) == "de" else "❌ An error occurred. Please try again."
+        error_text = "❌ Ein Fehler ist aufgetreten. Bitte versuchen Sie es erneut." if get_user_language(user_id) == "de" else "❌ An error occurred. Please try again."
         await callback.message.edit_text(error_text)
         await callback.answer()
         
 @router.callback_query(F.data == "accessibility_menu")
 async def accessibility_callback(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    language = user_languages.get(user_id, "en")
+    language = get_user_language(user_id)
 
     text = accessibility_feature.get_info_text(language)
 
@@ -255,7 +324,7 @@ async def navigation_callback(callback: types.CallbackQuery):
 @router.callback_query(F.data == "contact_info")
 async def contact_info_callback(callback: types.CallbackQuery):
     user_id = callback.from_user.id
-    language = user_languages.get(user_id, "en")
+    language = get_user_language(user_id)
     
     if language == "de":
         contact_text=contact_text_de
@@ -291,59 +360,74 @@ async def send_message_safe(message: types.Message, text: str, reply_markup=None
         await message.answer(text, reply_markup=reply_markup, parse_mode=None)
 
 
+async def edit_message_safe(message: types.Message, text: str, reply_markup=None):
+    try:
+        await message.edit_text(text, reply_markup=reply_markup, parse_mode=ParseMode.MARKDOWN)
+    except Exception as e:
+        logger.warning(f"Markdown-Parsing-Fehler – sende plain text: {e}")
+        await message.edit_text(text, reply_markup=reply_markup, parse_mode=None)
+
+
+async def answer_with_llm(message: types.Message, text: str, language: str):
+    """Stream the answer (local or LLM, see stream_hedged) into a single placeholder message."""
+    from utils.llm_connector import stream_hedged
+
+    question_tracker.record(text, language)
+    placeholder = await message.answer("💬 Frage wird verarbeitet...")
+
+    # partial answers are sent as plain text and throttled to Telegram's edit limits;
+    # Markdown is only attempted on the final edit. Cached, local and non-streaming
+    # answers arrive as a single delta, so nothing is shown until a second one proves
+    # the answer is really streaming, and error messages are never shown as partial text
+    answer = ""
+    deltas = 0
+    last_edit = 0.0
+    async for delta in stream_hedged(text, language, user_id=str(message.from_user.id)):
+        answer += delta
+        deltas += 1
+        now = asyncio.get_running_loop().time()
+        if deltas > 1 and "❌" not in answer and now - last_edit >= LLM_EDIT_INTERVAL:
+            try:
+                await placeholder.edit_text(f"{answer} ▌", parse_mode=None)
+            except Exception as e:
+                logger.debug(f"Skipped partial answer edit: {e}")
+            last_edit = now
+
+    if not answer or "Fehler" in answer:
+        answer = "❌ Leider konnte keine Antwort generiert werden."
+
+    keyboard = get_main_menu_keyboard(language)
+    await edit_message_safe(placeholder, answer, reply_markup=keyboard)
+
+
 @router.message(F.text)
 async def handle_text_message(message: types.Message):
     """Handle text messages"""
     user_id = message.from_user.id
+    # routing matches the words as typed; typos are only corrected for the Q&A match
     text = message.text.lower()
     
     language = detect_language(message.text)
-    user_languages[user_id] = language
-    
-    booking_keywords = [
-        "book", "booking", "reserve", "reservation", "ticket", 
-        "buchen", "buchung", "reservierung", "ticket", "eintrittskarte"
-    ]
-    
-    accessibility_keywords = [
-        "accessibility", "disabled", "wheelchair", "barrierefreiheit", 
-        "behindert", "rollstuhl", "autism", "autismus", "sensory", "sensorisch"
-    ]
-
-    qa_keywords = [
-    "öffnungszeiten", "opening hours", "einrichtungen", "facilities",
-    "café", "cafe", "sicherheit", "safety", "vegetarisch", "vegetarian"
-    ]
-
+    user_states.get_or_create(user_id).language = language
 
-    if any(keyword in text for keyword in booking_keywords):
+    if any(keyword in text for keyword in BOOKING_KEYWORDS):
         await booking_feature.handle_text_booking(message, bot)
-    elif any(keyword in text for keyword in accessibility_keywords):
+    elif any(keyword in text for keyword in ACCESSIBILITY_KEYWORDS):
         response = accessibility_feature.get_info_text(language)
         keyboard = get_main_menu_keyboard(language)
         await message.answer(response, reply_markup=keyboard)
-    elif any(keyword in text for keyword in qa_keywords):
+    elif any(keyword in text for keyword in QA_KEYWORDS):
         response = get_enhanced_response(text, str(user_id))
         keyboard = get_main_menu_keyboard(language)
         await message.answer(response, reply_markup=keyboard)
     else:
-        from utils.llm_connector import query_llm
-
-        await message.answer("💬 Frage wird verarbeitet...")
-
-        llm_response = await query_llm(message.text, language)
-        
-        if not llm_response or "Fehler" in llm_response:
-            llm_response = "❌ Leider konnte keine Antwort generiert werden."
-
-        keyboard = get_main_menu_keyboard(language)
-        await send_message_safe(message, llm_response, reply_markup=keyboard)
+        await answer_with_llm(message, message.text, language)
 
     
 @router.message(F.voice)
 async def handle_voice_message(message: types.Message):
     user_id = message.from_user.id
-    language = user_languages.get(user_id, "en")
+    language = get_user_language(user_id)
 
     if voice_processor is None:
         if language == "de":
@@ -354,20 +438,55 @@ async def handle_voice_message(message: types.Message):
         keyboard = get_main_menu_keyboard(language)
         await message.answer(response, reply_markup=keyboard)
         return
+
+    # forwarded or re-sent voice notes keep their file_unique_id
+    file_unique_id = message.voice.file_unique_id
+    cached = await transcription_cache.get(file_unique_id)
+
+    if cached is None and not voice_processor.is_ready():
+        # the model is still warming up in the background: hold the message
+        # for a while, then fall back to the static voice help text
+        if not await voice_processor.wait_until_ready(VOICE_READY_TIMEOUT):
+            response = voice_response_de if language == "de" else voice_response_en
+            await message.answer(response, reply_markup=get_main_menu_keyboard(language))
+            return
+
+    if cached is None and voice_processor.is_busy():
+        await message.answer(voice_busy_de if language == "de" else voice_busy_en)
+        return
     
     try:
         processing_msg = "🎤 Verarbeite Sprachnachricht..." if language == "de" else "🎤 Processing voice message..."
         status_message = await message.answer(processing_msg)
-        
-        # downloaded voice file
-        file_info = await bot.get_file(message.voice.file_id)
-        voice_file = await bot.download_file(file_info.file_path)
-        
-        # transcribe
-        transcribed_text, detected_lang = await voice_processor.transcribe_voice(voice_file.getvalue())
-        
-        if transcribed_text:
-            user_languages[user_id] = detected_lang
+
+        if cached is not None:
+            transcribed_text, detected_lang = cached
+        else:
+            # downloaded voice file
+            file_info = await bot.get_file(message.voice.file_id)
+            voice_file = await bot.download_file(file_info.file_path)
+
+            # transcribe straight from the download buffer, without copying it;
+            # long clips stream partial transcripts into the status message
+            transcribed_text, detected_lang = "", "en"
+            last_edit = 0.0
+            async for transcribed_text, detected_lang, is_final in voice_processor.transcribe_stream(voice_file.getbuffer()):
+                now = asyncio.get_running_loop().time()
+                if not is_final and now - last_edit >= VOICE_EDIT_INTERVAL:
+                    # a progress edit is cosmetic: a rate limit or an unchanged text must not fail the request
+                    try:
+                        await status_message.edit_text(f"{processing_msg}\n\n🗣️ {transcribed_text}", parse_mode=None)
+                    except Exception as e:
+                        logger.debug(f"Skipped partial transcript edit: {e}")
+                    last_edit = now
+
+            if transcribed_text and detected_lang != TRANSCRIPTION_BUSY:
+                await transcription_cache.put(file_unique_id, transcribed_text, detected_lang)
+
+        if detected_lang == TRANSCRIPTION_BUSY:
+            await status_message.edit_text(voice_busy_de if language == "de" else voice_busy_en)
+        elif transcribed_text:
+            user_states.get_or_create(user_id).language = detected_lang
             
             await status_message.delete()
             
@@ -397,23 +516,8 @@ async def process_transcribed_text(message: types.Message, text: str, language:
         logger.warning(f"Invalid transcribed text: {text}")
         return
     
-    booking_keywords = [
-        "book", "booking", "reserve", "reservation", "ticket", 
-        "buchen", "buchung", "reservierung", "ticket", "eintrittskarte"
-    ]
-    
-    accessibility_keywords = [
-        "accessibility", "disabled", "wheelchair", "barrierefreiheit", 
-        "behindert", "rollstuhl", "autism", "autismus", "sensory", "sensorisch"
-    ]
-
-    qa_keywords = [
-        "öffnungszeiten", "opening hours", "einrichtungen", "facilities",
-        "café", "cafe", "sicherheit", "safety", "vegetarisch", "vegetarian"
-    ]
-
     try:
-        if any(keyword in text_lower for keyword in booking_keywords):
+        if any(keyword in text_lower for keyword in BOOKING_KEYWORDS):
             # Create a new message-like object instead of modifying the frozen one
             class TextMessage:
                 def __init__(self, original_message, text):
@@ -425,26 +529,16 @@ async def process_transcribed_text(message: types.Message, text: str, language:
             
             text_message = TextMessage(message, text)
             await booking_feature.handle_text_booking(text_message, bot)
-        elif any(keyword in text_lower for keyword in accessibility_keywords):
+        elif any(keyword in text_lower for keyword in ACCESSIBILITY_KEYWORDS):
             response = accessibility_feature.get_info_text(language)
             keyboard = get_main_menu_keyboard(language)
             await message.answer(response, reply_markup=keyboard)
-        elif any(keyword in text for keyword in qa_keywords):
+        elif any(keyword in text for keyword in QA_KEYWORDS):
             response = get_enhanced_response(text, str(user_id))
             keyboard = get_main_menu_keyboard(language)
             await message.answer(response, reply_markup=keyboard)
         else:
-            from utils.llm_connector import query_llm
-
-            await message.answer("💬 Frage wird verarbeitet...")
-
-            llm_response = await query_llm(text, language)
-
-            if not llm_response or "Fehler" in llm_response:
-                llm_response = "❌ Leider konnte keine Antwort generiert werden."
-
-            keyboard = get_main_menu_keyboard(language)
-            await send_message_safe(message, llm_response, reply_markup=keyboard)
+            await answer_with_llm(message, text, language)
 
     except Exception as e:
         logger.error(f"Error processing transcribed text: {e}")
@@ -456,7 +550,7 @@ async def process_transcribed_text(message: types.Message, text: str, language:
 async def handle_location(message: types.Message):
     """Handle location sharing"""
     user_id = message.from_user.id
-    language = user_languages.get(user_id, "en")
+    language = get_user_language(user_id)
     
     lat = message.location.latitude
     lon = message.location.longitude
@@ -476,14 +570,51 @@ async def handle_photo(message: types.Message):
 
 async def main():
     logger.info("Starting Bamboolino Playground Bot...")
-    
+
+    setup()
     dp.include_router(router)
+
+    from utils.llm_connector import start_http_client, close_http_client
+
+    # one pooled, keep-alive HTTP client for all LLM requests
+    start_http_client()
+
+    # load Whisper in the background so text users are served right away
+    voice_warmup = asyncio.create_task(voice_processor.load())
+    # the tokenizer may be downloaded on first start, so it is never loaded on the event loop
+    knowledge_warmup = asyncio.create_task(warm_up_knowledge())
+
+    pregeneration = None
+    if os.getenv('LLM_PREGENERATE', 'true').lower() == 'true':
+        pregeneration = asyncio.create_task(pregenerate_answers(
+            question_tracker,
+            interval_seconds=float(os.getenv('LLM_PREGENERATE_INTERVAL_MINUTES', '60')) * 60,
+            off_peak=parse_hours(os.getenv('LLM_PREGENERATE_HOURS', '2-6')),
+            ttl_seconds=float(os.getenv('LLM_PREGENERATE_TTL_HOURS', '24')) * 3600
+        ))
+
+    # answers can be edited in the knowledge base file without restarting the bot
+    knowledge_watcher = None
+    reload_interval = float(os.getenv('QA_RELOAD_INTERVAL', '5'))
+    if reload_interval > 0:
+        knowledge_watcher = asyncio.create_task(watch_knowledge_base(reload_interval))
     
     try:
         await dp.start_polling(bot)
     except Exception as e:
         logger.error(f"Error starting bot: {e}")
     finally:
+        voice_warmup.cancel()
+        knowledge_warmup.cancel()
+        if pregeneration is not None:
+            pregeneration.cancel()
+        if knowledge_watcher is not None:
+            knowledge_watcher.cancel()
+        question_tracker.save()
+        logger.info(f"User state at shutdown: {user_states.get_stats()}")
+        voice_processor.shutdown()
+        transcription_cache.close()
+        await close_http_client()
         await bot.session.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,127 @@
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Words that carry no meaning for matching questions, so "Do you have parking?"
+# and "Is there parking" end up with the same key. Negations are kept on purpose.
+STOPWORDS = {
+    "en": {
+        "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "you", "your",
+        "i", "we", "me", "my", "our", "there", "here", "it", "its", "this", "that", "of", "to",
+        "in", "on", "at", "for", "with", "have", "has", "can", "could", "would", "will", "please",
+        "any", "some", "what", "hi", "hello", "hey", "tell", "about", "and", "or", "so"
+    },
+    "de": {
+        "der", "die", "das", "den", "dem", "des", "ein", "eine", "einen", "einem", "einer", "ist",
+        "sind", "war", "gibt", "es", "habt", "haben", "hat", "ihr", "sie", "du", "ich", "wir",
+        "mir", "uns", "bei", "euch", "im", "in", "am", "an", "auf", "zu", "für", "mit", "von",
+        "kann", "können", "könnt", "bitte", "hallo", "und", "oder", "so", "da", "dort", "mal"
+    }
+}
+
+
+def normalize_question(text: str, language: str = "en") -> str:
+    """Case-fold, strip punctuation and stopwords; the remaining words form the cache key."""
+    words = re.findall(r"\w+", text.casefold())
+    stopwords = STOPWORDS.get(language, STOPWORDS["en"])
+    meaningful = sorted({word for word in words if word not in stopwords})
+    # questions made only of stopwords still get a stable key
+    return " ".join(meaningful or words)
+
+
+class AnswerCache:
+    """In-memory LRU of LLM answers keyed on the normalized question and language.
+
+    Entries expire after ``ttl_seconds``. Each language remembers the fingerprint
+    of the knowledge base its answers were generated from; when the knowledge base
+    changes, all answers of that language are dropped.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 6 * 3600):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+
+        # key -> (answer, expires_at, seconds the LLM took to produce it)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[str, float, float]]" = OrderedDict()
+        self._fingerprints: Dict[str, str] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.saved_seconds = 0.0
+
+    def get(self, question: str, language: str, fingerprint: str) -> Optional[str]:
+        """Return the cached answer for a question, or None."""
+        self._check_fingerprint(language, fingerprint)
+        key = (language, normalize_question(question, language))
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            answer, expires_at, latency = entry
+            if time.time() <= expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.saved_seconds += latency
+                return answer
+            del self._entries[key]
+
+        self.misses += 1
+        return None
+
+    def contains(self, question: str, language: str, fingerprint: str) -> bool:
+        """Check for a fresh answer without touching the LRU order or the hit statistics."""
+        if self._fingerprints.get(language) != fingerprint:
+            return False
+        entry = self._entries.get((language, normalize_question(question, language)))
+        return entry is not None and time.time() <= entry[1]
+
+    def put(self, question: str, language: str, fingerprint: str, answer: str, latency: float = 0.0,
+            ttl_seconds: Optional[float] = None):
+        """Store an answer together with how long the LLM took to produce it.
+
+        ``ttl_seconds`` overrides the cache-wide TTL, e.g. for pre-generated answers.
+        Only lookups move a language to a new fingerprint; an answer stored under
+        an older one is dropped.
+        """
+        if not answer:
+            return
+        # generated from a knowledge base that has been replaced while the LLM was answering
+        if self._fingerprints.get(language, fingerprint) != fingerprint:
+            return
+
+        self._fingerprints[language] = fingerprint
+        key = (language, normalize_question(question, language))
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        self._entries[key] = (answer, time.time() + ttl, latency)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _check_fingerprint(self, language: str, fingerprint: str):
+        previous = self._fingerprints.get(language)
+        if previous == fingerprint:
+            return
+
+        self._fingerprints[language] = fingerprint
+        if previous is not None:
+            stale = [key for key in self._entries if key[0] == language]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def get_stats(self) -> dict:
+        lookups = self.hits + self.misses
+
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "invalidations": self.invalidations,
+            "saved_seconds": self.saved_seconds
+        }
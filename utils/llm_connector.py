@@ -1,39 +1,741 @@
 import httpx
 import asyncio
+import heapq
+import itertools
+import json
+import logging
 import os
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 
-from features.qa_system.qa_data import QA_DATABASE
+from features.qa_system.knowledge_base import KnowledgeBase, current_knowledge
+from features.qa_system.qa_data import get_enhanced_response
+from features.qa_system.qa_retrieval import count_tokens
+from utils.answer_cache import AnswerCache, normalize_question
 
-API_URL = "http://134.60.124.44:8000"
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    H2_AVAILABLE = True
+except ImportError:
+    H2_AVAILABLE = False
+
+API_URL = os.getenv("LLM_API_URL", "http://134.60.124.44:8000")
 API_KEY = os.getenv("LLM_API_KEY")
 USER_ID = "group4"
 
-def build_system_prompt(language: str = "en") -> str:
-    if language == "de":
-        prompt_lines = [
-            "Du bist ein hilfreicher Assistent für den Bamboolino Indoor-Spielplatz.",
-            "Beantworte Benutzerfragen ausschließlich basierend auf den folgenden Fakten.",
-            "Wenn du etwas nicht weißt, sag einfach, dass du es nicht weißt.\n"
-        ]
+# Connection pool settings for the shared HTTP client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "false").lower() == "true"
+
+# Token budget of the system prompt; only the QA sections most relevant to the question are included
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "600"))
+
+# Waiting for task results: strategy, overall deadline and poll backoff
+LLM_WAIT_MODE = os.getenv("LLM_WAIT_MODE", "poll")
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "60"))
+LLM_POLL_INITIAL = float(os.getenv("LLM_POLL_INITIAL", "0.1"))
+LLM_POLL_MAX = float(os.getenv("LLM_POLL_MAX", "2"))
+LLM_POLL_MULTIPLIER = 1.6
+LLM_POLL_JITTER = 0.2
+LLM_LONG_POLL_SECONDS = float(os.getenv("LLM_LONG_POLL_SECONDS", "20"))
+
+# Admission control: concurrent backend tasks, queue priority and circuit breaker
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+# queued prompts are ordered by arrival time plus this many seconds per character
+LLM_PRIORITY_SECONDS_PER_CHAR = float(os.getenv("LLM_PRIORITY_SECONDS_PER_CHAR", "0.02"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+# Hedged answering: local answers (retrieval confidence 0..1) at or above LLM_HEDGE_CONFIDENT_SCORE win outright; answers at or
+# above LLM_HEDGE_ACCEPT_SCORE that share at least LLM_HEDGE_MIN_TERMS meaningful words with the question are used if the
+# LLM has not started answering within LLM_HEDGE_WAIT seconds
+LLM_HEDGE = os.getenv("LLM_HEDGE", "true").lower() == "true"
+LLM_HEDGE_CONFIDENT_SCORE = float(os.getenv("LLM_HEDGE_CONFIDENT_SCORE", "0.5"))
+LLM_HEDGE_ACCEPT_SCORE = float(os.getenv("LLM_HEDGE_ACCEPT_SCORE", "0.35"))
+LLM_HEDGE_MIN_TERMS = int(os.getenv("LLM_HEDGE_MIN_TERMS", "2"))
+LLM_HEDGE_WAIT = float(os.getenv("LLM_HEDGE_WAIT", "3"))
+
+# Answers to repeated questions are served from memory instead of the backend
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("LLM_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_HOURS", "6")) * 3600
+)
+
+_client: Optional[httpx.AsyncClient] = None
+_pool_stats = {"requests": 0, "error_responses": 0}
+
+
+async def _on_request(request: httpx.Request):
+    _pool_stats["requests"] += 1
+
+
+async def _on_response(response: httpx.Response):
+    if response.status_code >= 400:
+        _pool_stats["error_responses"] += 1
+
+
+def start_http_client() -> httpx.AsyncClient:
+    """Create the application-wide HTTP client; call once from main()."""
+    global _client
+
+    if _client is not None and not _client.is_closed:
+        return _client
+
+    http2 = LLM_HTTP2 and H2_AVAILABLE
+    if LLM_HTTP2 and not H2_AVAILABLE:
+        logging.warning("LLM_HTTP2 is enabled but h2 is not installed - falling back to HTTP/1.1")
+
+    _client = httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+        event_hooks={"request": [_on_request], "response": [_on_response]}
+    )
+    logging.info(f"LLM HTTP client started ({'HTTP/2' if http2 else 'HTTP/1.1'}, "
+                 f"max {LLM_MAX_CONNECTIONS} connections, {LLM_MAX_KEEPALIVE} keep-alive)")
+    return _client
+
+
+async def close_http_client():
+    """Close the shared HTTP client and its pooled connections on shutdown."""
+    global _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # created lazily when query_llm is used outside of main(), e.g. from scripts
+    if _client is None or _client.is_closed:
+        return start_http_client()
+    return _client
+
+
+def get_pool_stats() -> dict:
+    """Connection pool usage of the shared client."""
+    connections = []
+    if _client is not None:
+        # httpcore's pool is not part of httpx's public API, so read it defensively
+        pool = getattr(getattr(_client, "_transport", None), "_pool", None)
+        connections = list(getattr(pool, "connections", []) or [])
+    idle = sum(1 for connection in connections if connection.is_idle())
+
+    return {
+        "open": _client is not None and not _client.is_closed,
+        "http2": bool(_client is not None and LLM_HTTP2 and H2_AVAILABLE),
+        "max_connections": LLM_MAX_CONNECTIONS,
+        "max_keepalive": LLM_MAX_KEEPALIVE,
+        "connections": len(connections),
+        "idle_connections": idle,
+        "active_connections": len(connections) - idle,
+        **_pool_stats
+    }
+
+
+# The static part of the system prompt, built once per language
+PROMPT_PREAMBLES = {
+    "de": "\n\n".join([
+        "Du bist ein hilfreicher Assistent für den Bamboolino Indoor-Spielplatz.",
+        "Beantworte Benutzerfragen ausschließlich basierend auf den folgenden Fakten.",
+        "Wenn du etwas nicht weißt, sag einfach, dass du es nicht weißt.\n"
+    ]),
+    "en": "\n\n".join([
+        "You are a helpful assistant for the Bamboolino indoor playground.",
+        "Answer user questions only using the following facts.",
+        "If you don't know something, just say you don't know.\n"
+    ])
+}
+
+
+def build_system_prompt(language: str = "en", question: Optional[str] = None,
+                        token_budget: int = LLM_PROMPT_TOKEN_BUDGET,
+                        knowledge: Optional[KnowledgeBase] = None) -> str:
+    """Build the system prompt from the preamble and the QA sections of ``knowledge``.
+
+    With a question, only the sections most relevant to it are included, as many
+    as fit in ``token_budget``; without one, the whole knowledge base is used,
+    rendered once per knowledge base snapshot.
+    """
+    knowledge = knowledge or current_knowledge()
+    preamble = PROMPT_PREAMBLES["de" if language == "de" else "en"]
+    retriever = knowledge.retriever
+
+    if question is None:
+        if language not in knowledge.prompts:
+            sections = [text for _, text, _, _ in retriever.rank("", language)]
+            knowledge.prompts[language] = "\n\n".join([preamble] + sections)
+        return knowledge.prompts[language]
+
+    # counted per prompt, not at import: the exact tokenizer is loaded in the background after startup
+    preamble_tokens = count_tokens(preamble)
+    budget = max(0, token_budget - preamble_tokens)
+    sections, section_tokens = retriever.select(question, language, budget)
+    logging.info(f"LLM prompt: {len(sections)}/{retriever.section_count(language)} sections, "
+                 f"~{preamble_tokens + section_tokens} tokens")
+    return "\n\n".join([preamble] + sections)
+
+
+class TaskWait:
+    """Bookkeeping for one backend task while its result is awaited."""
+
+    def __init__(self, task_id: str, on_partial: Optional[Callable[[str], None]] = None):
+        self.task_id = task_id
+        self.polls = 0
+        self.started = time.monotonic()
+        self.first_text_at: Optional[float] = None
+        self.partial = ""
+        self.on_partial = on_partial
+
+    def report_partial(self, text: Optional[str]) -> bool:
+        """Pass on the answer generated so far; returns True if it grew."""
+        if not text or len(text) <= len(self.partial):
+            return False
+        if self.first_text_at is None:
+            self.first_text_at = time.monotonic()
+        self.partial = text
+        if self.on_partial is not None:
+            self.on_partial(text)
+        return True
+
+
+# recent tasks and running totals of how long results took to arrive
+_recent_waits = deque(maxlen=200)
+_wait_totals = {"tasks": 0, "answered": 0, "timeouts": 0, "cancelled": 0, "errors": 0, "polls": 0, "wait_seconds": 0.0}
+
+
+def _response_text(data: dict) -> Optional[str]:
+    messages = data.get("response")
+    if messages:
+        return messages[-1]["content"][0]["text"]
+    return None
+
+
+async def _wait_poll(client: httpx.AsyncClient, wait: TaskWait) -> str:
+    # short first interval, then exponential backoff with jitter up to LLM_POLL_MAX
+    delay = LLM_POLL_INITIAL
+    while True:
+        wait.polls += 1
+        result = await client.get(f"{API_URL}/tasks/{wait.task_id}/response")
+        result.raise_for_status()
+        data = result.json()
+        text = _response_text(data)
+        if text is not None:
+            return text
+
+        # while a partial answer keeps growing, poll at the current rate instead of backing off
+        growing = wait.report_partial(data.get("partial"))
+        await asyncio.sleep(delay * random.uniform(1 - LLM_POLL_JITTER, 1 + LLM_POLL_JITTER))
+        if not growing:
+            delay = min(delay * LLM_POLL_MULTIPLIER, LLM_POLL_MAX)
+
+
+async def _wait_long_poll(client: httpx.AsyncClient, wait: TaskWait) -> str:
+    # the backend holds the request open until the answer is ready or `wait` seconds pass
+    timeout = httpx.Timeout(LLM_LONG_POLL_SECONDS + LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+    while True:
+        wait.polls += 1
+        result = await client.get(
+            f"{API_URL}/tasks/{wait.task_id}/response",
+            params={"wait": LLM_LONG_POLL_SECONDS},
+            timeout=timeout
+        )
+        result.raise_for_status()
+        data = result.json()
+        text = _response_text(data)
+        if text is not None:
+            return text
+        wait.report_partial(data.get("partial"))
+
+
+async def _wait_sse(client: httpx.AsyncClient, wait: TaskWait) -> str:
+    # server-sent events: every "data:" line carries the task state as JSON,
+    # optionally with a "delta" of newly generated text or the "partial" answer so far
+    timeout = httpx.Timeout(None, connect=LLM_CONNECT_TIMEOUT)
+    wait.polls += 1
+    async with client.stream("GET", f"{API_URL}/tasks/{wait.task_id}/events", timeout=timeout) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = json.loads(line[5:].strip())
+            text = _response_text(data)
+            if text is not None:
+                return text
+            if data.get("delta"):
+                wait.report_partial(wait.partial + data["delta"])
+            else:
+                wait.report_partial(data.get("partial"))
+    raise RuntimeError("event stream ended without a response")
+
+
+WAIT_STRATEGIES: Dict[str, Callable[[httpx.AsyncClient, TaskWait], Awaitable[str]]] = {
+    "poll": _wait_poll,
+    "long_poll": _wait_long_poll,
+    "sse": _wait_sse
+}
+
+
+def register_wait_strategy(name: str, strategy: Callable[[httpx.AsyncClient, TaskWait], Awaitable[str]]):
+    """Plug in another way of waiting for task results, selectable with LLM_WAIT_MODE."""
+    WAIT_STRATEGIES[name] = strategy
+
+
+def _record_wait(wait: TaskWait, outcome: str):
+    elapsed = time.monotonic() - wait.started
+    first_text = wait.first_text_at - wait.started if wait.first_text_at is not None else None
+    _recent_waits.append({"task_id": wait.task_id, "polls": wait.polls, "wait_seconds": elapsed,
+                          "first_text_seconds": first_text, "outcome": outcome})
+    _wait_totals["tasks"] += 1
+    _wait_totals[outcome] += 1
+    _wait_totals["polls"] += wait.polls
+    _wait_totals["wait_seconds"] += elapsed
+    logging.info(f"LLM task {wait.task_id}: {outcome} after {elapsed:.2f}s and {wait.polls} poll(s)")
+
+
+def get_polling_stats() -> dict:
+    """Per-task poll counts and wait times for recent tasks, plus totals."""
+    tasks = _wait_totals["tasks"] or 1
+    return {
+        "wait_mode": LLM_WAIT_MODE,
+        "deadline_seconds": LLM_DEADLINE,
+        **_wait_totals,
+        "avg_polls": _wait_totals["polls"] / tasks,
+        "avg_wait_seconds": _wait_totals["wait_seconds"] / tasks,
+        "recent": list(_recent_waits)
+    }
+
+
+def get_answer_cache_stats() -> dict:
+    """Hit rate of the answer cache and the LLM time its hits saved."""
+    return answer_cache.get_stats()
+
+
+class AdmissionQueue:
+    """Limits concurrent backend tasks; waiting prompts are served shortest-first.
+
+    A prompt's priority is its arrival time plus ``seconds_per_char`` for every
+    character, so short interactive questions overtake long ones without
+    starving them.
+    """
+
+    def __init__(self, max_in_flight: int, seconds_per_char: float):
+        self.max_in_flight = max(1, max_in_flight)
+        self.seconds_per_char = seconds_per_char
+        self.in_flight = 0
+
+        self._waiting = []
+        self._sequence = itertools.count()
+
+        self.admitted = 0
+        self.queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def acquire(self, prompt: str) -> float:
+        """Wait for a free slot and return the seconds spent queueing."""
+        started = time.monotonic()
+        if self.in_flight < self.max_in_flight and not self._waiting:
+            self.in_flight += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            priority = started + len(prompt) * self.seconds_per_char
+            heapq.heappush(self._waiting, (priority, next(self._sequence), future))
+            self.queued += 1
+            try:
+                # release() hands its slot over by resolving the future
+                await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    self.release()
+                else:
+                    future.cancel()
+                raise
+
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        return waited
+
+    def release(self):
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def get_stats(self) -> dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "queue_depth": sum(1 for _, _, future in self._waiting if not future.done()),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "avg_queue_wait_ms": self.total_wait / self.admitted * 1000 if self.admitted else 0.0,
+            "max_queue_wait_ms": self.max_wait * 1000
+        }
+
+
+class CircuitBreaker:
+    """Stops sending work to a failing backend.
+
+    After ``failure_threshold`` consecutive errors or timeouts the breaker opens
+    and requests are answered locally. Once ``reset_timeout`` seconds have passed
+    it lets a single probe through (half-open); a successful probe closes it
+    again, a failed one reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            logging.info("LLM circuit breaker half-open - probing the backend")
+
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record(self, success: bool):
+        self.probe_in_flight = False
+        if success:
+            if self.state != self.CLOSED:
+                logging.info("LLM circuit breaker closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            return
+
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+                logging.warning(f"LLM circuit breaker open after {self.failures} failure(s)")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def get_stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+            "retry_in_seconds": max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+            if self.state == self.OPEN else 0.0
+        }
+
+
+admission = AdmissionQueue(LLM_MAX_IN_FLIGHT, LLM_PRIORITY_SECONDS_PER_CHAR)
+breaker = CircuitBreaker(LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
+
+
+def get_admission_stats() -> dict:
+    """Queue wait times of the admission layer and the circuit breaker state."""
+    return {"queue": admission.get_stats(), "breaker": breaker.get_stats()}
+
+
+class _Flight:
+    """One backend request shared by every caller asking the same question."""
+
+    def __init__(self, key: Tuple[str, str, str]):
+        self.key = key
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        # streaming callers get the partial answer pushed into their queues
+        self.partial = ""
+        self.listeners: List[asyncio.Queue] = []
+        # cache TTL for the answer, the longest any caller asked for; read when the answer is stored,
+        # so a caller that joins later (e.g. pre-generation) still gets its TTL
+        self.cache_ttl: Optional[float] = None
+
+    def publish(self, text: str):
+        self.partial = text
+        for listener in self.listeners:
+            listener.put_nowait(text)
+
+
+# (language, normalized question, knowledge base fingerprint) -> request in progress
+_inflight: Dict[Tuple[str, str, str], _Flight] = {}
+_flight_stats = {"submissions": 0, "coalesced": 0, "abandoned": 0}
+_stream_stats = {"streams": 0, "first_text_seconds": 0.0, "total_seconds": 0.0}
+
+
+def get_coalescing_stats() -> dict:
+    """Backend submissions saved by joining identical in-flight requests."""
+    return {"in_flight": len(_inflight), **_flight_stats}
+
+
+def get_streaming_stats() -> dict:
+    """Average time until streamed answers show their first text, and until they complete."""
+    streams = _stream_stats["streams"] or 1
+    return {
+        "streams": _stream_stats["streams"],
+        "avg_first_text_ms": _stream_stats["first_text_seconds"] / streams * 1000,
+        "avg_total_ms": _stream_stats["total_seconds"] / streams * 1000
+    }
+
+
+def _join_flight(user_input: str, language: str, knowledge: KnowledgeBase, max_tokens: int, user_id: str,
+                 cache_ttl: Optional[float] = None) -> _Flight:
+    key = (language, normalize_question(user_input, language), knowledge.fingerprint)
+    flight = _inflight.get(key)
+    if flight is None:
+        flight = _inflight[key] = _Flight(key)
+        flight.task = asyncio.create_task(
+            _fetch_answer(user_input, language, knowledge, max_tokens, user_id, flight)
+        )
+        flight.task.add_done_callback(lambda _, flight=flight: _forget_flight(flight))
+        _flight_stats["submissions"] += 1
     else:
-        prompt_lines = [
-            "You are a helpful assistant for the Bamboolino indoor playground.",
-            "Answer user questions only using the following facts.",
-            "If you don't know something, just say you don't know.\n"
-        ]
-    
-    for key, data in QA_DATABASE.items():
-        if language in data:
-            section_title = key.replace("_", " ").title()
-            prompt_lines.append(f"{section_title}:\n{data[language]}")
-    
-    return "\n\n".join(prompt_lines)
-
-async def query_llm(user_input: str, language: str = "en", max_tokens: int = 64) -> str:
+        _flight_stats["coalesced"] += 1
+
+    if cache_ttl is not None:
+        flight.cache_ttl = cache_ttl if flight.cache_ttl is None else max(flight.cache_ttl, cache_ttl)
+    flight.waiters += 1
+    return flight
+
+
+def _forget_flight(flight: _Flight):
+    # a newer flight for the same question may already have taken the key
+    if _inflight.get(flight.key) is flight:
+        del _inflight[flight.key]
+
+
+def _leave_flight(flight: _Flight):
+    # the shared task only stops once the last interested caller has gone away
+    if flight.waiters == 1 and not flight.task.done():
+        flight.task.cancel()
+        # a cancelled task finishes only on a later loop tick; callers asking
+        # the same question before then must start a new request, not join it
+        _forget_flight(flight)
+        _flight_stats["abandoned"] += 1
+    flight.waiters -= 1
+
+
+async def query_llm(user_input: str, language: str = "en", max_tokens: int = 64, user_id: str = "default",
+                    cache_ttl: Optional[float] = None) -> str:
+    # the knowledge base fingerprint invalidates cached answers when the knowledge base changes
+    knowledge = current_knowledge()
+
+    cached = answer_cache.get(user_input, language, knowledge.fingerprint)
+    if cached is not None:
+        return cached
+
+    flight = _join_flight(user_input, language, knowledge, max_tokens, user_id, cache_ttl)
+    try:
+        return await asyncio.shield(flight.task)
+    finally:
+        _leave_flight(flight)
+
+
+async def stream_llm(user_input: str, language: str = "en", max_tokens: int = 64,
+                     user_id: str = "default") -> AsyncIterator[str]:
+    """Like query_llm, but yields the answer as text deltas while it is generated.
+
+    Backends that report partial answers (a "partial" field while polling, or
+    "delta"/"partial" server-sent events) are streamed; otherwise the whole
+    answer arrives as a single delta. Closing the iterator early abandons the
+    request like cancelling query_llm does.
+    """
+    started = time.monotonic()
+    knowledge = current_knowledge()
+
+    cached = answer_cache.get(user_input, language, knowledge.fingerprint)
+    if cached is not None:
+        yield cached
+        return
+
+    flight = _join_flight(user_input, language, knowledge, max_tokens, user_id)
+    updates = asyncio.Queue()
+    flight.listeners.append(updates)
+    if flight.partial:
+        updates.put_nowait(flight.partial)
+
+    def done(_):
+        # None marks the end of the stream
+        updates.put_nowait(None)
+
+    flight.task.add_done_callback(done)
+
+    sent = ""
+    first_text_at = None
+    try:
+        while True:
+            text = await updates.get()
+            if text is None:
+                break
+            if text.startswith(sent) and len(text) > len(sent):
+                first_text_at = first_text_at or time.monotonic()
+                yield text[len(sent):]
+                sent = text
+
+        answer = flight.task.result()
+        first_text_at = first_text_at or time.monotonic()
+        if answer.startswith(sent):
+            if len(answer) > len(sent):
+                yield answer[len(sent):]
+        else:
+            # the final answer replaced the partial one (e.g. an error after a timeout)
+            yield f"\n\n{answer}"
+        _stream_stats["streams"] += 1
+        _stream_stats["first_text_seconds"] += first_text_at - started
+        _stream_stats["total_seconds"] += time.monotonic() - started
+    finally:
+        flight.listeners.remove(updates)
+        flight.task.remove_done_callback(done)
+        _leave_flight(flight)
+
+
+_hedge_stats = {
+    "local": {"wins": 0, "losses": 0},
+    "llm": {"wins": 0, "losses": 0},
+    "confident": 0,
+    "llm_only": 0
+}
+
+
+def get_hedging_stats() -> dict:
+    """Win/loss counts of the local and LLM paths in hedged answering."""
+    answered = _hedge_stats["local"]["wins"] + _hedge_stats["llm"]["wins"] + _hedge_stats["llm_only"]
+    return {
+        "enabled": LLM_HEDGE,
+        "confident_score": LLM_HEDGE_CONFIDENT_SCORE,
+        "accept_score": LLM_HEDGE_ACCEPT_SCORE,
+        "min_terms": LLM_HEDGE_MIN_TERMS,
+        "wait_seconds": LLM_HEDGE_WAIT,
+        **_hedge_stats,
+        # share of questions answered locally instead of by the LLM
+        "diverted_share": _hedge_stats["local"]["wins"] / answered if answered else 0.0
+    }
+
+
+async def stream_hedged(user_input: str, language: str = "en", max_tokens: int = 64,
+                        user_id: str = "default") -> AsyncIterator[str]:
+    """Race a local QA answer against the LLM and stream whichever is used.
+
+    The LLM request starts right away while the question is scored against the
+    knowledge base. A confident local answer is returned immediately and the
+    LLM request is abandoned; an acceptable one, which must also share at
+    least LLM_HEDGE_MIN_TERMS words with the question so that one common word
+    like "area" is not enough, is kept as a fallback if the LLM has not
+    produced text within LLM_HEDGE_WAIT seconds.
+    """
+    stream = stream_llm(user_input, language, max_tokens, user_id)
+    if not LLM_HEDGE:
+        async for delta in stream:
+            yield delta
+        return
+
+    first = asyncio.ensure_future(stream.__anext__())
+    try:
+        local, score, matched = await asyncio.to_thread(current_knowledge().local_answer, user_input, language)
+
+        if local is not None and score >= LLM_HEDGE_CONFIDENT_SCORE:
+            _hedge_stats["confident"] += 1
+            winner = "local"
+        elif local is not None and score >= LLM_HEDGE_ACCEPT_SCORE and matched >= LLM_HEDGE_MIN_TERMS:
+            await asyncio.wait({first}, timeout=LLM_HEDGE_WAIT)
+            # an early LLM error does not beat an acceptable local answer
+            llm_answered = (first.done() and not first.cancelled() and first.exception() is None
+                            and "❌" not in first.result())
+            winner = "llm" if llm_answered else "local"
+        else:
+            _hedge_stats["llm_only"] += 1
+            winner = None
+
+        if winner == "local":
+            first.cancel()
+            _hedge_stats["local"]["wins"] += 1
+            _hedge_stats["llm"]["losses"] += 1
+            logging.info(f"Hedged answer: local (score {score:.2f})")
+            yield local
+            return
+
+        if winner == "llm":
+            _hedge_stats["llm"]["wins"] += 1
+            _hedge_stats["local"]["losses"] += 1
+
+        try:
+            yield await first
+        except StopAsyncIteration:
+            return
+        async for delta in stream:
+            yield delta
+    finally:
+        if not first.done():
+            first.cancel()
+            try:
+                await first
+            except (asyncio.CancelledError, StopAsyncIteration):
+                pass
+        await stream.aclose()
+
+
+async def _fetch_answer(user_input: str, language: str, knowledge: KnowledgeBase, max_tokens: int, user_id: str,
+                        flight: _Flight) -> str:
+    # while the backend is failing, answer from the local knowledge base right away
+    if not breaker.allow():
+        return get_enhanced_response(user_input, user_id)
+
+    try:
+        await admission.acquire(user_input)
+        try:
+            started = time.monotonic()
+            system_prompt = build_system_prompt(language, user_input, knowledge=knowledge)
+            answer = await _query_backend(user_input, system_prompt, max_tokens, flight.publish)
+        finally:
+            admission.release()
+    except asyncio.CancelledError:
+        # an abandoned request says nothing about the backend's health
+        breaker.probe_in_flight = False
+        raise
+
+    success = not answer.startswith("❌")
+    breaker.record(success)
+
+    # error messages are returned to the caller but never cached
+    if success:
+        answer_cache.put(user_input, language, knowledge.fingerprint, answer, time.monotonic() - started,
+                         flight.cache_ttl)
+    return answer
+
+
+async def _query_backend(user_input: str, system_prompt: str, max_tokens: int,
+                         on_partial: Optional[Callable[[str], None]] = None) -> str:
     history = [
         {
             "role": "system",
-            "content": [{"type": "text", "text": build_system_prompt(language)}]
+            "content": [{"type": "text", "text": system_prompt}]
         },
         {
             "role": "user",
@@ -52,23 +754,31 @@ async def query_llm(user_input: str, language: str = "en", max_tokens: int = 64)
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient() as client:
-        try:
-            resp = await client.post(f"{API_URL}/tasks", json=payload, headers=headers)
-            resp.raise_for_status()
-            task_id = resp.json()["task_id"]
-        except Exception as e:
-            return f"❌ Fehler beim Senden: {e}"
+    client = get_http_client()
+    deadline = time.monotonic() + LLM_DEADLINE
 
-        while True:
-            try:
-                result = await client.get(f"{API_URL}/tasks/{task_id}/response")
-                result.raise_for_status()
-                data = result.json()
-                messages = data.get("response")
-
-                if messages:
-                    return messages[-1]["content"][0]["text"]
-                await asyncio.sleep(2)
-            except Exception as e:
-                return f"❌ Fehler beim Empfangen: {e}"
\ No newline at end of file
+    try:
+        resp = await client.post(f"{API_URL}/tasks", json=payload, headers=headers)
+        resp.raise_for_status()
+        task_id = resp.json()["task_id"]
+    except Exception as e:
+        return f"❌ Fehler beim Senden: {e}"
+
+    strategy = WAIT_STRATEGIES.get(LLM_WAIT_MODE, _wait_poll)
+    wait = TaskWait(task_id, on_partial)
+
+    # cancelling the caller cancels the wait, which stops polling right away
+    try:
+        text = await asyncio.wait_for(strategy(client, wait), timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        _record_wait(wait, "timeouts")
+        return f"❌ Fehler: Zeitüberschreitung nach {LLM_DEADLINE:.0f}s"
+    except asyncio.CancelledError:
+        _record_wait(wait, "cancelled")
+        raise
+    except Exception as e:
+        _record_wait(wait, "errors")
+        return f"❌ Fehler beim Empfangen: {e}"
+
+    _record_wait(wait, "answered")
+    return text
@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from utils.answer_cache import normalize_question
+
+
+class CountMinSketch:
+    """Fixed-size frequency estimates; never undercounts, overcounts by at most ~2/width of the total."""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [[0] * width for _ in range(depth)]
+
+    def _columns(self, key: str) -> List[int]:
+        # blake2b instead of hash(): Python's string hash changes between runs, the sketch is persisted
+        return [
+            int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8, salt=bytes([row])).digest(), "little")
+            % self.width
+            for row in range(self.depth)
+        ]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count ``key`` and return its new estimate."""
+        estimate = None
+        for row, column in enumerate(self._columns(key)):
+            self.rows[row][column] += count
+            value = self.rows[row][column]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(self.rows[row][column] for row, column in enumerate(self._columns(key)))
+
+    def decay(self, factor: float = 0.5):
+        """Age all counts so the sketch follows what is asked now."""
+        self.rows = [[int(value * factor) for value in row] for row in self.rows]
+
+
+class QuestionTracker:
+    """Heavy-hitter fallback questions per language: a count-min sketch plus top-K.
+
+    Questions are counted under their normalized form (the answer cache key), and
+    the top-K list remembers one original wording to pre-generate answers for.
+    Memory is fixed by the sketch size and K; the state is saved to ``path`` as
+    JSON so it survives restarts.
+    """
+
+    def __init__(self, top_k: int = 20, width: int = 2048, depth: int = 4, path: Optional[str] = None):
+        self.top_k = max(1, top_k)
+        self.path = path
+        self.sketch = CountMinSketch(width, depth)
+        # language -> normalized question -> [estimated count, original question]
+        self.top: Dict[str, Dict[str, list]] = {}
+        self.recorded = 0
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def record(self, question: str, language: str):
+        normalized = normalize_question(question, language)
+        if not normalized:
+            return
+
+        count = self.sketch.add(f"{language}:{normalized}")
+        self.recorded += 1
+
+        top = self.top.setdefault(language, {})
+        if normalized in top or len(top) < self.top_k:
+            top[normalized] = [count, question]
+            return
+
+        weakest = min(top, key=lambda key: top[key][0])
+        if count > top[weakest][0]:
+            del top[weakest]
+            top[normalized] = [count, question]
+
+    def heavy_hitters(self, language: str) -> List[Tuple[str, int]]:
+        """Return (question, estimated count) for the top-K questions, most frequent first."""
+        ranked = sorted(self.top.get(language, {}).values(), key=lambda entry: entry[0], reverse=True)
+        return [(question, count) for count, question in ranked]
+
+    def decay(self, factor: float = 0.5):
+        self.sketch.decay(factor)
+        for top in self.top.values():
+            for entry in top.values():
+                entry[0] = int(entry[0] * factor)
+
+    def save(self):
+        if not self.path:
+            return
+
+        state = {
+            "width": self.sketch.width,
+            "depth": self.sketch.depth,
+            "rows": self.sketch.rows,
+            "top": self.top,
+            "recorded": self.recorded
+        }
+        # write to a temporary file first, so a crash never leaves half a sketch behind
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, "w", encoding="utf-8") as file:
+                json.dump(state, file, ensure_ascii=False)
+            os.replace(temporary, self.path)
+        except OSError as e:
+            logging.warning(f"Failed to save question sketch {self.path}: {e}")
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as file:
+                state = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Failed to load question sketch {self.path}: {e}")
+            return
+
+        if state.get("width") != self.sketch.width or state.get("depth") != self.sketch.depth:
+            logging.info("Question sketch size changed - starting with empty counts")
+            return
+
+        self.sketch.rows = state["rows"]
+        self.recorded = state.get("recorded", 0)
+        self.top = {
+            language: dict(sorted(top.items(), key=lambda item: item[1][0], reverse=True)[:self.top_k])
+            for language, top in state.get("top", {}).items()
+        }
+
+    def get_stats(self) -> dict:
+        return {
+            "recorded": self.recorded,
+            "top_k": self.top_k,
+            "sketch_cells": self.sketch.width * self.sketch.depth,
+            "heavy_hitters": {language: self.heavy_hitters(language)[:5] for language in self.top}
+        }
+
+
+def parse_hours(window: str) -> Tuple[int, int]:
+    """Parse an "HH-HH" window of local hours; the end hour is exclusive and may wrap past midnight.
+
+    A window that starts and ends at the same hour, like "0-24", covers the whole day.
+    """
+    start, _, end = window.partition("-")
+    return int(start) % 24, int(end or start) % 24
+
+
+def in_window(hour: int, window: Tuple[int, int]) -> bool:
+    start, end = window
+    if start == end:
+        return True
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+async def pregenerate_answers(tracker: QuestionTracker, interval_seconds: float, off_peak: Tuple[int, int],
+                              ttl_seconds: float, languages: Tuple[str, ...] = ("de", "en")):
+    """Background task: in off-peak hours, warm the answer cache for the heavy-hitter questions.
+
+    Every ``interval_seconds`` the tracker is saved; inside the ``off_peak``
+    window the top-K questions per language that are not cached yet are sent
+    through query_llm one at a time, and stored for ``ttl_seconds`` so they are
+    still warm at peak. Counts are halved after each refresh, so old favourites
+    make way for new ones.
+    """
+    from features.qa_system.knowledge_base import current_knowledge
+    from utils.llm_connector import answer_cache, query_llm
+
+    while True:
+        await asyncio.sleep(interval_seconds)
+        tracker.save()
+
+        if not in_window(datetime.now().hour, off_peak):
+            continue
+
+        started = time.monotonic()
+        generated = 0
+        fingerprint = current_knowledge().fingerprint
+        for language in languages:
+            for question, _ in tracker.heavy_hitters(language):
+                if answer_cache.contains(question, language, fingerprint):
+                    continue
+                await query_llm(question, language, user_id="pregeneration", cache_ttl=ttl_seconds)
+                # errors and the local fallback used while the circuit breaker is open are not cached
+                if answer_cache.contains(question, language, fingerprint):
+                    generated += 1
+
+        tracker.decay()
+        tracker.save()
+        logging.info(f"Pre-generated {generated} answer(s) for heavy-hitter questions "
+                     f"in {time.monotonic() - started:.1f}s")
@@ -172,6 +172,14 @@ voice_response_en="""🎤 Voice message received!
 
 💬 Just speak your question!"""
 
+voice_busy_de = """⏳ Gerade kommen sehr viele Sprachnachrichten an.
+
+Bitte versuchen Sie es in einer Minute noch einmal oder schreiben Sie Ihre Frage als Text."""
+
+voice_busy_en = """⏳ We are receiving a lot of voice messages right now.
+
+Please try again in a minute or type your question instead."""
+
 location_response_de = f"""📍 **Standort empfangen!**
 
 🚗 **Navigation zu Bamboolino:**
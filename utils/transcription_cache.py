@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class TranscriptionCache:
+    """Two-level cache of voice transcriptions keyed by Telegram's file_unique_id.
+
+    The first level is an in-memory LRU bounded by entry count, the second a
+    SQLite table whose rows expire after ``ttl_seconds``. Forwarded voice notes
+    keep their file_unique_id, so a hit skips both the download and Whisper.
+    """
+
+    def __init__(self, max_entries: int = 1024, db_path: Optional[str] = None, ttl_seconds: float = 7 * 24 * 3600):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+
+        self._memory: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            try:
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS transcriptions ("
+                    "file_unique_id TEXT PRIMARY KEY, text TEXT NOT NULL, "
+                    "language TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                self._db.execute(
+                    "DELETE FROM transcriptions WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.error(f"Failed to open transcription cache {db_path}: {e}")
+                self._db = None
+
+    async def get(self, file_unique_id: str) -> Optional[Tuple[str, str]]:
+        """Return the cached (text, language) for a voice file, or None."""
+        entry = self._memory.get(file_unique_id)
+        if entry is not None:
+            text, language, created_at = entry
+            if time.time() - created_at <= self.ttl_seconds:
+                self._memory.move_to_end(file_unique_id)
+                self.memory_hits += 1
+                return text, language
+            del self._memory[file_unique_id]
+
+        if self._db is not None:
+            row = await asyncio.to_thread(self._disk_get, file_unique_id)
+            if row is not None:
+                text, language, created_at = row
+                self._remember(file_unique_id, text, language, created_at)
+                self.disk_hits += 1
+                return text, language
+
+        self.misses += 1
+        return None
+
+    async def put(self, file_unique_id: str, text: str, language: str):
+        """Store a successful transcription in both levels."""
+        if not file_unique_id or not text:
+            return
+
+        created_at = time.time()
+        self._remember(file_unique_id, text, language, created_at)
+
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, file_unique_id, text, language, created_at)
+
+    def _remember(self, file_unique_id: str, text: str, language: str, created_at: float):
+        self._memory[file_unique_id] = (text, language, created_at)
+        self._memory.move_to_end(file_unique_id)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, file_unique_id: str) -> Optional[Tuple[str, str, float]]:
+        try:
+            with self._db_lock:
+                return self._db.execute(
+                    "SELECT text, language, created_at FROM transcriptions "
+                    "WHERE file_unique_id = ? AND created_at >= ?",
+                    (file_unique_id, time.time() - self.ttl_seconds)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"Transcription cache read failed: {e}")
+            return None
+
+    def _disk_put(self, file_unique_id: str, text: str, language: str, created_at: float):
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO transcriptions (file_unique_id, text, language, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (file_unique_id, text, language, created_at)
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Transcription cache write failed: {e}")
+
+    def close(self):
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def get_stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        hits = self.memory_hits + self.disk_hits
+
+        return {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "disk_enabled": self._db is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,140 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Optional, Union
+
+# approximate cost of one OrderedDict entry (hash table slot plus linked-list node) on CPython
+_ENTRY_OVERHEAD = 100
+
+
+class UserState:
+    """Everything the bot remembers about one user, in a compact slotted record."""
+
+    __slots__ = ("language", "conversation_count", "booking", "last_seen", "footprint")
+
+    def __init__(self):
+        self.language = "en"
+        # Q&A answers to this user so far; returning users get a "welcome back"
+        self.conversation_count = 0
+        # the booking in progress, or None
+        self.booking: Optional[dict] = None
+        self.last_seen = time.monotonic()
+        self.footprint = 0
+
+
+class UserStateStore:
+    """Per-user state with LRU and idle-time eviction under a memory budget.
+
+    Users are kept in least-recently-seen order; whenever a user is added,
+    users idle for longer than ``idle_ttl_seconds`` are dropped, and then the
+    least recently seen ones until at most ``max_users`` remain and the
+    estimated size fits in ``memory_budget_bytes``. A record's size is measured
+    again every time it is looked up, so a booking that grew since the last
+    lookup is counted late, but never forgotten.
+    """
+
+    def __init__(self, max_users: int = 10000, idle_ttl_seconds: float = 30 * 86400,
+                 memory_budget_bytes: Optional[int] = 16 * 1024 * 1024):
+        self._states: "OrderedDict[str, UserState]" = OrderedDict()
+        self._bytes = 0
+        self.created = 0
+        self.evictions = {"idle": 0, "lru": 0, "memory": 0}
+        self.configure(max_users, idle_ttl_seconds, memory_budget_bytes)
+
+    def configure(self, max_users: int, idle_ttl_seconds: float, memory_budget_bytes: Optional[int]):
+        """Change the limits; users beyond the new ones are evicted right away."""
+        self.max_users = max(1, max_users)
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self._evict()
+
+    @staticmethod
+    def _key(user_id: Union[int, str]) -> str:
+        # handlers use Telegram's int ids, features their str form
+        return str(user_id)
+
+    def _measure(self, key: str, state: UserState):
+        size = _ENTRY_OVERHEAD + sys.getsizeof(key) + sys.getsizeof(state)
+        if state.booking:
+            size += sys.getsizeof(state.booking) + sum(sys.getsizeof(value) for value in state.booking.values())
+        self._bytes += size - state.footprint
+        state.footprint = size
+
+    def _touch(self, key: str, state: UserState):
+        state.last_seen = time.monotonic()
+        self._states.move_to_end(key)
+        self._measure(key, state)
+
+    def get(self, user_id: Union[int, str]) -> Optional[UserState]:
+        """Return the user's state, or None if the user is unknown, evicted or idle for too long."""
+        key = self._key(user_id)
+        state = self._states.get(key)
+        if state is None:
+            return None
+        if time.monotonic() - state.last_seen > self.idle_ttl_seconds:
+            self._remove(key, "idle")
+            return None
+
+        self._touch(key, state)
+        return state
+
+    def get_or_create(self, user_id: Union[int, str]) -> UserState:
+        state = self.get(user_id)
+        if state is not None:
+            return state
+
+        key = self._key(user_id)
+        state = self._states[key] = UserState()
+        self._measure(key, state)
+        self.created += 1
+        self._evict()
+        return state
+
+    def discard(self, user_id: Union[int, str]):
+        key = self._key(user_id)
+        if key in self._states:
+            self._remove(key)
+
+    def __contains__(self, user_id: Union[int, str]) -> bool:
+        return self._key(user_id) in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _remove(self, key: str, reason: Optional[str] = None):
+        state = self._states.pop(key)
+        self._bytes -= state.footprint
+        if reason:
+            self.evictions[reason] += 1
+
+    def _evict(self):
+        # the oldest users are at the front, so idle ones are found without a full scan
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        while self._states:
+            key, state = next(iter(self._states.items()))
+            if state.last_seen >= cutoff:
+                break
+            self._remove(key, "idle")
+
+        # the newest user (at the end) is always kept
+        while len(self._states) > self.max_users:
+            self._remove(next(iter(self._states)), "lru")
+        while self.memory_budget_bytes is not None and self._bytes > self.memory_budget_bytes and len(self._states) > 1:
+            self._remove(next(iter(self._states)), "memory")
+
+    def get_stats(self) -> dict:
+        return {
+            "users": len(self._states),
+            "max_users": self.max_users,
+            "estimated_bytes": self._bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+            "active_bookings": sum(1 for state in self._states.values() if state.booking),
+            "created": self.created,
+            "evictions": dict(self.evictions)
+        }
+
+
+# shared by the Q&A, booking and language handling; main.py applies the
+# USER_STATE_* settings through configure() once .env has been loaded
+user_states = UserStateStore()
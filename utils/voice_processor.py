@@ -1,193 +1,1302 @@
-import whisper
 import io
-import tempfile
 import os
+import shutil
+import subprocess
 import asyncio
 import functools
 import logging
-from typing import Tuple, Optional
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import AsyncIterator, Callable, List, Tuple, Optional, Union
+
+import numpy as np
+
+# whisper 和 torch 的导入耗时数秒，只在真正加载模型或推理时才导入，
+# 这样机器人启动时不会被阻塞
+
+# 检查 ffmpeg 是否可用（内存解码依赖它）
+FFMPEG_AVAILABLE = shutil.which("ffmpeg") is not None
+if not FFMPEG_AVAILABLE:
+    logging.warning("ffmpeg not available - voice decoding disabled")
+
+# Whisper 的采样率，以及单个解码窗口的采样数（30 秒 @ 16 kHz）
+SAMPLE_RATE = 16000
+MAX_BATCH_SAMPLES = 30 * SAMPLE_RATE
+
+# 模型加载状态
+MODEL_NOT_LOADED = "not_loaded"
+MODEL_LOADING = "loading"
+MODEL_READY = "ready"
+MODEL_FAILED = "failed"
+
+# 转录队列已满时 transcribe_voice 返回的语言代码
+TRANSCRIPTION_BUSY = "busy"
+
+# 语言映射
+LANGUAGE_MAP = {
+    "german": "de",
+    "deutsch": "de",
+    "de": "de",
+    "english": "en",
+    "en": "en"
+}
+
+
+def decode_audio(voice_file_bytes: Union[bytes, memoryview],
+                 sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    通过一个 ffmpeg 管道在内存中解码语音，不写任何临时文件
+
+    Args:
+        voice_file_bytes: bot.download_file 得到的 OGG/Opus 字节数据
+        sample_rate: 目标采样率
+
+    Returns:
+        np.ndarray: 单声道 float32 音频，取值范围 [-1, 1]
+    """
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate),
+        "pipe:1"
+    ]
+    process = subprocess.run(cmd, input=voice_file_bytes, capture_output=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed to decode audio: {process.stderr.decode(errors='ignore').strip()}")
+
+    return np.frombuffer(process.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def normalize_language(detected_language: Optional[str]) -> str:
+    """
+    将 Whisper 检测到的语言映射为机器人支持的语言代码
+
+    Args:
+        detected_language: Whisper 返回的语言标识
+
+    Returns:
+        str: "de" 或 "en"
+    """
+    # 确保 detected_language 不为 None
+    if not detected_language or not isinstance(detected_language, str):
+        return "en"
+
+    # 安全地处理语言检测
+    try:
+        return LANGUAGE_MAP.get(detected_language.lower().strip(), "en")
+    except (AttributeError, TypeError):
+        return "en"
+
+
+class CascadePolicy:
+    """
+    模型级联策略：先用小模型转录，只有置信度低的片段才交给大模型重新转录
+    """
+
+    def __init__(self, escalation_model_size: str = "base", logprob_threshold: float = -1.0,
+                 no_speech_threshold: float = 0.6, compression_ratio_threshold: float = 2.4):
+        """
+        初始化级联策略（阈值默认值与 Whisper 自身的回退阈值一致）
+
+        Args:
+            escalation_model_size: 升级使用的大模型，首次需要时才加载
+            logprob_threshold: avg_logprob 低于该值时升级
+            no_speech_threshold: no_speech_prob 高于该值时升级
+            compression_ratio_threshold: 压缩比高于该值（通常是重复幻觉）时升级
+        """
+        self.escalation_model_size = escalation_model_size
+        self.logprob_threshold = logprob_threshold
+        self.no_speech_threshold = no_speech_threshold
+        self.compression_ratio_threshold = compression_ratio_threshold
+
+    def needs_escalation(self, avg_logprob: float, no_speech_prob: float, compression_ratio: float) -> bool:
+        return (
+            avg_logprob < self.logprob_threshold
+            or no_speech_prob > self.no_speech_threshold
+            or compression_ratio > self.compression_ratio_threshold
+        )
+
+
+class VoiceActivityDetector:
+    """
+    基于能量的语音活动检测：裁掉首尾的静音和背景噪声，拒绝整体过于安静（没有语音）的片段，并限制最长处理时长
+    """
+
+    def __init__(self, frame_ms: int = 30, margin_db: float = 10.0, min_level_db: float = -50.0,
+                 padding_ms: int = 200, min_speech_ms: int = 250, max_seconds: Optional[float] = 120.0):
+        """
+        初始化语音活动检测
+
+        Args:
+            frame_ms: 计算能量的帧长（毫秒）
+            margin_db: 帧能量比噪声底高出多少 dB 才算语音
+            min_level_db: 语音帧的绝对最低能量（dBFS）
+            padding_ms: 在检测到的语音前后保留的余量（毫秒）
+            min_speech_ms: 语音帧总时长低于该值时视为没有语音
+            max_seconds: 最长处理时长，超出部分直接丢弃；None 表示不限
+        """
+        self.frame_size = SAMPLE_RATE * frame_ms // 1000
+        self.margin_db = margin_db
+        self.min_level_db = min_level_db
+        self.padding = SAMPLE_RATE * padding_ms // 1000
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_samples = int(max_seconds * SAMPLE_RATE) if max_seconds else None
+
+    def trim(self, audio: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        裁剪音频首尾的非语音部分
+
+        Args:
+            audio: 16 kHz 单声道 float32 音频
+
+        Returns:
+            Tuple[np.ndarray, float]: (裁剪后的音频，整体过于安静时为空数组；
+            噪声中找不到语音边界时为未裁剪的音频, 被跳过的秒数)
+        """
+        total = audio.shape[0]
+        frame_count = total // self.frame_size
+        if frame_count == 0:
+            return audio[:0], total / SAMPLE_RATE
+
+        frames = audio[:frame_count * self.frame_size].reshape(frame_count, self.frame_size)
+        energy_db = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+
+        # 只有整体都很安静（绝对能量低于 min_level_db）的片段才算没有语音
+        if np.count_nonzero(energy_db > self.min_level_db) < self.min_speech_frames:
+            return audio[:0], total / SAMPLE_RATE
+
+        # 以较安静的帧估计噪声底
+        noise_floor = np.percentile(energy_db, 10)
+        threshold = max(noise_floor + self.margin_db, self.min_level_db)
+        speech = np.flatnonzero(energy_db > threshold)
+
+        if speech.size < self.min_speech_frames:
+            # 语音淹没在持续的背景噪声里（游乐场很常见），相对阈值找不到边界：不裁剪，交给 Whisper
+            start, end = 0, total
+        else:
+            start = max(0, speech[0] * self.frame_size - self.padding)
+            end = min(total, (speech[-1] + 1) * self.frame_size + self.padding)
+        if self.max_samples is not None:
+            end = min(end, start + self.max_samples)
+
+        return audio[start:end], (total - (end - start)) / SAMPLE_RATE
+
+
+# 每个进程内已加载的模型（级联的大模型按需加载）
+_model_cache = {}
+_model_cache_lock = threading.Lock()
+
+
+def get_model(model_size: str, quantize: bool = False):
+    """
+    获取（必要时加载）指定大小的 Whisper 模型，同一进程内只加载一次
+
+    Args:
+        model_size: Whisper模型大小
+        quantize: 是否使用 int8 动态量化的模型（仅 CPU）
+
+    Returns:
+        已加载的 Whisper 模型
+    """
+    import whisper
+
+    key = (model_size, quantize)
+    with _model_cache_lock:
+        if key not in _model_cache:
+            if quantize:
+                _model_cache[key] = _load_quantized_model(model_size)
+            else:
+                logging.info(f"Loading Whisper model: {model_size}")
+                _model_cache[key] = whisper.load_model(model_size)
+                logging.info(f"Whisper model {model_size} loaded successfully")
+        return _model_cache[key]
+
+
+def quantized_model_path(model_size: str) -> str:
+    """
+    int8 量化模型在磁盘上的缓存路径（与 Whisper 的下载目录相同，文件名包含 torch 版本）
+
+    Args:
+        model_size: Whisper模型大小
+
+    Returns:
+        str: 缓存文件路径
+    """
+    import torch
+
+    cache_root = os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_root, "whisper", f"{model_size}-int8-torch{torch.__version__}.pt")
+
+
+def _load_quantized_model(model_size: str):
+    """
+    加载 int8 动态量化的 Whisper 模型，首次量化后缓存到磁盘，之后启动直接读取
+
+    Args:
+        model_size: Whisper模型大小
+
+    Returns:
+        量化后的 Whisper 模型
+    """
+    import torch
+    import whisper
+
+    path = quantized_model_path(model_size)
+    if os.path.exists(path):
+        try:
+            logging.info(f"Loading quantized Whisper model from {path}")
+            return torch.load(path, map_location="cpu", weights_only=False)
+        except Exception as e:
+            logging.warning(f"Failed to load quantized model cache {path}: {e}, re-quantizing")
+
+    logging.info(f"Quantizing Whisper model {model_size} to int8")
+    model = whisper.load_model(model_size, device="cpu")
+
+    # Whisper 的 Linear 子类只重写了 forward 做 dtype 转换，在 CPU fp32 下可直接换回 nn.Linear，
+    # 否则 quantize_dynamic 不会识别它们
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+
+    model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        torch.save(model, path)
+        logging.info(f"Saved quantized Whisper model to {path}")
+    except Exception as e:
+        logging.warning(f"Failed to cache quantized model at {path}: {e}")
+
+    return model
+
+
+def _decode_clips(model, clips: List[np.ndarray]) -> list:
+    """
+    将多段不超过 30 秒的音频填充为 log-mel 片段并一次性批量解码
+
+    Args:
+        model: 已加载的 Whisper 模型
+        clips: 16 kHz 单声道 float32 音频列表
+
+    Returns:
+        list: 与输入顺序一致的 whisper.DecodingResult 列表
+    """
+    import torch
+    import whisper
+
+    n_mels = model.dims.n_mels
+    mel_batch = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=n_mels)
+        for audio in clips
+    ]).to(model.device)
+
+    options = whisper.DecodingOptions(
+        task="transcribe",
+        language=None,  # 自动检测语言
+        fp16=False,  # 在CPU上禁用fp16
+        without_timestamps=True
+    )
+    return whisper.decode(model, mel_batch, options)
+
+
+def transcribe_batch(model, voice_files: List[Union[bytes, memoryview]],
+                     cascade: Optional[CascadePolicy] = None,
+                     quantize: bool = False,
+                     vad: Optional[VoiceActivityDetector] = None) -> Tuple[List[Tuple[str, str]], dict]:
+    """
+    同步批量转录
+
+    不超过 30 秒的语音填充为 log-mel 片段后一次性批量解码，
+    更长的语音仍按单条完整转录。启用级联时，置信度低的片段
+    会用更大的模型重新转录。
+
+    Args:
+        model: 已加载的 Whisper 模型（级联时为第一级小模型）
+        voice_files: 多条语音文件的字节数据
+        cascade: 级联策略，None 表示不级联
+        quantize: 级联的大模型是否使用 int8 量化
+        vad: 语音活动检测，在推理前裁掉首尾静音；None 表示不裁剪
+
+    Returns:
+        Tuple[List[Tuple[str, str]], dict]: 与输入顺序一致的 (转录文本, 语言代码) 列表，
+        以及本批次各阶段耗时和级联统计
+    """
+    metrics = {
+        "batches": 1,
+        "escalation_batches": 0,
+        "clips": 0,
+        "segments": 0,
+        "escalated_segments": 0,
+        "audio_seconds": 0.0,
+        "skipped_seconds": 0.0,
+        "no_speech_clips": 0,
+        "decode_seconds": 0.0,
+        "vad_seconds": 0.0,
+        "tier1_seconds": 0.0,
+        "tier2_seconds": 0.0
+    }
+    results: List[Tuple[str, str]] = [("", "en")] * len(voice_files)
+
+    started = time.perf_counter()
+    audios = [_load_audio(voice_file_bytes) for voice_file_bytes in voice_files]
+    metrics["decode_seconds"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for index, audio in enumerate(audios):
+        if audio is None or isinstance(voice_files[index], np.ndarray):
+            continue
+        metrics["audio_seconds"] += audio.shape[0] / SAMPLE_RATE
+        if vad is None:
+            continue
+
+        audios[index], skipped = vad.trim(audio)
+        metrics["skipped_seconds"] += skipped
+        if audios[index].size == 0:
+            metrics["no_speech_clips"] += 1
+            logging.info(f"No speech detected in {audio.shape[0] / SAMPLE_RATE:.1f}s voice message, skipping")
+        elif skipped > 0:
+            logging.info(f"VAD skipped {skipped:.1f}s of {audio.shape[0] / SAMPLE_RATE:.1f}s voice message")
+    metrics["vad_seconds"] = time.perf_counter() - started
+
+    # 每个片段: [所属语音序号, 音频, 文本, 语言, 是否需要升级]
+    segments = []
+    clip_segments = {}
+
+    started = time.perf_counter()
+    short_clips = [(index, audio) for index, audio in enumerate(audios)
+                   if audio is not None and 0 < audio.shape[0] <= MAX_BATCH_SAMPLES]
+    if short_clips:
+        try:
+            logging.info(f"Transcribing batch of {len(short_clips)} voice message(s)")
+            decoded = _decode_clips(model, [audio for _, audio in short_clips])
+            for (index, audio), result in zip(short_clips, decoded):
+                escalate = cascade is not None and cascade.needs_escalation(
+                    result.avg_logprob, result.no_speech_prob, result.compression_ratio
+                )
+                clip_segments[index] = [len(segments)]
+                segments.append([index, audio, result.text, result.language, escalate])
+        except Exception as e:
+            logging.error(f"Batch decode error: {e}")
+
+    for index, audio in enumerate(audios):
+        if audio is not None and audio.shape[0] > MAX_BATCH_SAMPLES:
+            clip_segments[index] = []
+            for segment in _transcribe_long(model, audio, cascade):
+                clip_segments[index].append(len(segments))
+                segments.append([index, *segment])
+    metrics["tier1_seconds"] = time.perf_counter() - started
+
+    escalated = [segment for segment in segments if segment[4]]
+    if escalated:
+        started = time.perf_counter()
+        try:
+            logging.info(f"Escalating {len(escalated)} low-confidence segment(s) "
+                         f"to Whisper {cascade.escalation_model_size}")
+            large_model = get_model(cascade.escalation_model_size, quantize)
+            decoded = _decode_clips(large_model, [segment[1] for segment in escalated])
+            for segment, result in zip(escalated, decoded):
+                segment[2] = result.text
+                segment[3] = result.language
+        except Exception as e:
+            logging.error(f"Escalation decode error: {e}")
+        metrics["tier2_seconds"] = time.perf_counter() - started
+        metrics["escalation_batches"] = 1
+
+    # 流式转录的片段（ndarray）由 transcribe_stream 按整条语音计数，这里不算作语音条数
+    metrics["clips"] = sum(1 for index in clip_segments if not isinstance(voice_files[index], np.ndarray))
+    metrics["stream_chunks"] = len(clip_segments) - metrics["clips"]
+    metrics["segments"] = len(segments)
+    metrics["escalated_segments"] = len(escalated)
+
+    for index, positions in clip_segments.items():
+        parts = [segments[position] for position in positions]
+        text = " ".join(part[2].strip() for part in parts if part[2] and part[2].strip())
+        detected_language = parts[0][3] if parts else "en"
+        results[index] = _format_result(text, detected_language)
+
+    return results, metrics
+
+
+def _transcribe_long(model, audio: np.ndarray, cascade: Optional[CascadePolicy] = None) -> list:
+    """
+    转录超过单个解码窗口的长语音
+
+    Args:
+        model: 已加载的 Whisper 模型
+        audio: 16 kHz 单声道 float32 音频
+        cascade: 级联策略，用于标记需要升级的片段
+
+    Returns:
+        list: (音频片段, 文本, 语言, 是否需要升级) 列表
+    """
+    try:
+        result = model.transcribe(
+            audio,
+            fp16=False,  # 在CPU上禁用fp16
+            language=None,  # 自动检测语言
+            task="transcribe"
+        )
+    except Exception as e:
+        logging.error(f"Sync transcription error: {e}")
+        return []
+
+    # 安全地提取结果
+    detected_language = result.get("language", "en") if result else "en"
+    sample_rate = SAMPLE_RATE
+
+    segments = []
+    for segment in (result.get("segments") or [] if result else []):
+        start = int(segment["start"] * sample_rate)
+        end = min(int(segment["end"] * sample_rate), start + MAX_BATCH_SAMPLES)
+        escalate = cascade is not None and end > start and cascade.needs_escalation(
+            segment["avg_logprob"], segment["no_speech_prob"], segment["compression_ratio"]
+        )
+        segments.append((audio[start:end], segment["text"], detected_language, escalate))
+
+    return segments
+
+
+def _format_result(text: Optional[str], detected_language: Optional[str]) -> Tuple[str, str]:
+    text = (text or "").strip()
+    language = normalize_language(detected_language)
+
+    logging.info(f"Transcribed: '{text}' (detected: {detected_language} -> {language})")
+
+    # 验证转录结果
+    if not text or len(text.strip()) < 1:
+        logging.warning("Empty or too short transcription result")
+        return "", "en"
+
+    return text, language
+
+
+def _load_audio(voice_file_bytes: Union[bytes, memoryview, np.ndarray]) -> Optional[np.ndarray]:
+    # 流式转录提交的是已经解码并裁剪过的音频片段
+    if isinstance(voice_file_bytes, np.ndarray):
+        return voice_file_bytes
+
+    try:
+        return decode_audio(voice_file_bytes)
+    except Exception as e:
+        logging.error(f"Audio decoding error: {e}")
+        return None
+
+
+def prepare_audio(voice_file_bytes: Union[bytes, memoryview],
+                  vad: Optional[VoiceActivityDetector] = None) -> Tuple[Optional[np.ndarray], float]:
+    """
+    解码语音并（可选）裁掉首尾静音，供流式转录切分片段
+
+    Args:
+        voice_file_bytes: 语音文件的字节数据
+        vad: 语音活动检测，None 表示不裁剪
+
+    Returns:
+        Tuple[Optional[np.ndarray], float]: (处理后的音频，解码失败时为 None；没有语音时为空数组,
+        被跳过的秒数)
+    """
+    audio = _load_audio(voice_file_bytes)
+    if audio is None or vad is None:
+        return audio, 0.0
+
+    trimmed, skipped = vad.trim(audio)
+    if trimmed.size == 0:
+        logging.info(f"No speech detected in {audio.shape[0] / SAMPLE_RATE:.1f}s voice message, skipping")
+    elif skipped > 0:
+        logging.info(f"VAD skipped {skipped:.1f}s of {audio.shape[0] / SAMPLE_RATE:.1f}s voice message")
+    return trimmed, skipped
+
+
+def split_chunks(audio: np.ndarray, chunk_seconds: float, overlap_seconds: float) -> List[np.ndarray]:
+    """
+    将长音频切分为相互重叠的片段
+
+    Args:
+        audio: 16 kHz 单声道 float32 音频
+        chunk_seconds: 每个片段的长度（秒），不超过 30 秒
+        overlap_seconds: 相邻片段重叠的长度（秒）
+
+    Returns:
+        List[np.ndarray]: 音频片段列表
+    """
+    chunk = min(int(chunk_seconds * SAMPLE_RATE), MAX_BATCH_SAMPLES)
+    step = max(1, chunk - int(overlap_seconds * SAMPLE_RATE))
+
+    if audio.shape[0] <= chunk + step // 2:
+        return [audio]
+
+    chunks = []
+    for start in range(0, audio.shape[0], step):
+        chunks.append(audio[start:start + chunk])
+        if start + chunk >= audio.shape[0]:
+            break
+    return chunks
+
+
+def merge_overlap(previous: str, current: str, max_overlap_words: int = 12) -> str:
+    """
+    合并相邻片段的转录文本，去掉重叠部分重复识别出的词
+
+    Args:
+        previous: 已合并的文本
+        current: 新片段的文本
+        max_overlap_words: 最多比较的重叠词数
+
+    Returns:
+        str: 合并后的文本
+    """
+    previous_words = previous.split()
+    current_words = current.split()
+    if not previous_words:
+        return current.strip()
+    if not current_words:
+        return previous.strip()
+
+    def normalize(word: str) -> str:
+        return "".join(char for char in word.lower() if char.isalnum())
+
+    previous_keys = [normalize(word) for word in previous_words[-max_overlap_words:]]
+    current_keys = [normalize(word) for word in current_words[:max_overlap_words]]
+
+    # 找到 previous 结尾与 current 开头最长的相同词序列
+    overlap = 0
+    for size in range(min(len(previous_keys), len(current_keys)), 0, -1):
+        if previous_keys[-size:] == current_keys[:size]:
+            overlap = size
+            break
+
+    return " ".join(previous_words + current_words[overlap:])
+
+
+# 进程池工作进程中的模型和级联策略（每个进程在启动时加载一次）
+_worker_model = None
+_worker_cascade: Optional[CascadePolicy] = None
+_worker_quantize = False
+_worker_vad: Optional[VoiceActivityDetector] = None
+
+
+def _init_worker(model_size: str, torch_threads: Optional[int], cascade: Optional[CascadePolicy] = None,
+                 quantize: bool = False, vad: Optional[VoiceActivityDetector] = None):
+    """
+    进程池工作进程初始化：设置线程数并预加载模型
+
+    Args:
+        model_size: Whisper模型大小
+        torch_threads: 每个工作进程的 torch intra-op 线程数
+        cascade: 级联策略，大模型在工作进程中按需加载
+        quantize: 是否使用 int8 量化模型
+        vad: 语音活动检测
+    """
+    global _worker_model, _worker_cascade, _worker_quantize, _worker_vad
+
+    if torch_threads:
+        import torch
+        torch.set_num_threads(torch_threads)
+
+    _worker_cascade = cascade
+    _worker_quantize = quantize
+    _worker_vad = vad
+    try:
+        _worker_model = get_model(model_size, quantize)
+        logging.info(f"[worker {os.getpid()}] Whisper model {model_size} ready")
+    except Exception as e:
+        logging.error(f"[worker {os.getpid()}] Failed to load Whisper model: {e}")
+        _worker_model = None
+
+
+def warm_up(model):
+    """
+    用一段短的静音做一次推理，提前完成首次推理的初始化开销
+
+    Args:
+        model: 已加载的 Whisper 模型
+    """
+    _decode_clips(model, [np.zeros(SAMPLE_RATE, dtype=np.float32)])
+
+
+def _worker_warm_up() -> bool:
+    if _worker_model is None:
+        return False
+    warm_up(_worker_model)
+    return True
+
+
+def _worker_transcribe_batch(voice_files: List[bytes]) -> Tuple[List[Tuple[str, str]], dict]:
+    if _worker_model is None:
+        raise RuntimeError("Whisper model not available in worker process")
+    return transcribe_batch(_worker_model, voice_files, _worker_cascade, _worker_quantize, _worker_vad)
+
+
+class TranscriptionBusyError(Exception):
+    """转录队列已满"""
+
+
+class TranscriptionBatcher:
+    """
+    微批处理推理队列
+
+    在一个短时间窗口内收集并发的转录请求，合并成一次批量推理，
+    每个调用者仍然拿到自己的 (文本, 语言代码) 结果。
+    """
+
+    def __init__(self, run_batch: Callable[[list], Tuple[List[Tuple[str, str]], dict]],
+                 max_batch_size: int = 8, max_wait_ms: float = 50.0,
+                 max_queue_size: int = 0, max_concurrent_batches: int = 1,
+                 executor: Optional[Executor] = None):
+        """
+        初始化批处理队列
+
+        Args:
+            run_batch: 同步批量转录函数，在执行器中运行，返回 (结果列表, 阶段统计)
+            max_batch_size: 单批最多请求数
+            max_wait_ms: 第一个请求到达后最多等待多少毫秒来凑批
+            max_queue_size: 等待中的请求上限，超过时拒绝新请求（0 表示不限）
+            max_concurrent_batches: 同时进行推理的批次数
+            executor: 运行批量推理的执行器（None 表示默认线程池）
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue_size = max(0, max_queue_size)
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        self.executor = executor
+
+        # 队列和后台任务在第一次提交时于运行中的事件循环里创建
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._in_flight = 0
+        # 正在执行器中预处理（解码、VAD）的请求，与排队中的请求共用 max_queue_size 上限
+        self._preparing = 0
+        # 流式转录一次性预留的名额；这些片段排队时已计入预留，不再按排队请求重复计数
+        self._reserved = 0
+        self._reserved_futures = set()
+
+        self._requests = 0
+        self._rejected = 0
+        self._batches = 0
+        self._batch_size_total = 0
+        self._largest_batch = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._inference_total = 0.0
+        self._batch_size_counts = {}
+        self._metric_totals = {}
+
+    async def submit(self, voice_file_bytes: Union[bytes, memoryview], reserved: bool = False) -> Tuple[str, str]:
+        """
+        提交一个转录请求并等待它所在批次的结果
+
+        Args:
+            voice_file_bytes: 语音文件的字节数据
+            reserved: 调用者已通过 reserve() 预留名额，此时不会被拒绝
+
+        Returns:
+            Tuple[str, str]: (转录文本, 语言代码)
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_worker()
+
+        if not reserved and self.is_full():
+            self._rejected += 1
+            raise TranscriptionBusyError(f"Transcription queue is full ({self.max_queue_size} pending)")
+
+        future = loop.create_future()
+        if reserved:
+            self._reserved_futures.add(future)
+        self._queue.put_nowait((voice_file_bytes, future, loop.time()))
+        self._requests += 1
+
+        return await future
+
+    async def prepare(self, function: Callable, *args):
+        """
+        在推理执行器中运行预处理（解码、VAD），占用与排队请求相同的队列名额，
+        这样进程池前面的待处理任务也受 max_queue_size 限制
+
+        Args:
+            function: 在执行器中运行的同步函数
+            *args: 函数参数
+
+        Returns:
+            函数的返回值
+        """
+        loop = asyncio.get_running_loop()
+        self._ensure_worker()
+
+        if self.is_full():
+            self._rejected += 1
+            raise TranscriptionBusyError(f"Transcription queue is full ({self.max_queue_size} pending)")
+
+        self._preparing += 1
+        try:
+            return await loop.run_in_executor(self.executor, function, *args)
+        finally:
+            self._preparing -= 1
+
+    def reserve(self, count: int) -> int:
+        """
+        为一条流式语音的所有片段一次性预留队列名额，之后用 reserved=True 提交的片段不会被拒绝，
+        这样长语音不会在已经产出部分文本之后才因队列已满而失败
+
+        Args:
+            count: 片段数，超过 max_queue_size 时按 max_queue_size 预留
+
+        Returns:
+            int: 实际预留的名额，用完后交给 release()
+        """
+        self._ensure_worker()
+        if not self.max_queue_size:
+            return 0
+
+        count = min(count, self.max_queue_size)
+        if self._occupied() + count > self.max_queue_size:
+            self._rejected += 1
+            raise TranscriptionBusyError(f"Transcription queue is full ({self.max_queue_size} pending)")
+        self._reserved += count
+        return count
+
+    def release(self, count: int):
+        """
+        归还 reserve() 预留的名额
+
+        Args:
+            count: reserve() 的返回值
+        """
+        self._reserved -= count
+
+    def record_metrics(self, metrics: dict):
+        """
+        累加在批次之外测得的统计（例如流式转录按整条语音计的 VAD 统计）
+
+        Args:
+            metrics: 要累加的统计项
+        """
+        for key, value in metrics.items():
+            self._metric_totals[key] = self._metric_totals.get(key, 0) + value
+
+    def is_full(self) -> bool:
+        """
+        队列是否已满（新请求会被拒绝）
+
+        Returns:
+            bool: 排队和预处理中的请求达到上限时为 True
+        """
+        if not self.max_queue_size:
+            return False
+        return self._occupied() >= self.max_queue_size
+
+    def _occupied(self) -> int:
+        pending = self._queue.qsize() if self._queue is not None else 0
+        return pending - len(self._reserved_futures) + self._preparing + self._reserved
+
+    def _ensure_worker(self):
+        if self._worker is None or self._worker.done():
+            # 上限由 is_full() 和 reserve() 控制；预留名额的片段可能超出 max_queue_size 个
+            self._queue = self._queue or asyncio.Queue()
+            self._slots = self._slots or asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.get_running_loop().create_task(self._worker_loop())
+
+    async def _worker_loop(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            # 所有推理槽位都被占用时，新请求留在有界队列中等待
+            await self._slots.acquire()
+            batch = [await self._take()]
+            deadline = loop.time() + self.max_wait
+
+            # 在等待窗口内继续收集请求，直到凑满一批
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._take(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = loop.create_task(self._dispatch(batch))
+            task.add_done_callback(lambda _: self._slots.release())
+
+    async def _take(self):
+        item = await self._queue.get()
+        self._reserved_futures.discard(item[1])
+        return item
+
+    async def _dispatch(self, batch: list):
+        loop = asyncio.get_running_loop()
+
+        # 调用者已取消的请求不再参与推理
+        batch = [item for item in batch if not item[1].done()]
+        if not batch:
+            return
+
+        now = loop.time()
+        for _, _, enqueued_at in batch:
+            waited = now - enqueued_at
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        size = len(batch)
+        self._batches += 1
+        self._batch_size_total += size
+        self._largest_batch = max(self._largest_batch, size)
+        self._batch_size_counts[size] = self._batch_size_counts.get(size, 0) + 1
+
+        started = time.perf_counter()
+        self._in_flight += 1
+        try:
+            results, metrics = await loop.run_in_executor(
+                self.executor,
+                self.run_batch,
+                [audio for audio, _, _ in batch]
+            )
+        except Exception as e:
+            logging.error(f"Batch transcription error: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._in_flight -= 1
+            self._inference_total += time.perf_counter() - started
+
+        self.record_metrics(metrics)
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def get_stats(self) -> dict:
+        """
+        获取批处理统计信息，用于在吞吐量和延迟之间调优
+
+        Returns:
+            dict: 队列深度、批大小和等待时间统计
+        """
+        batches = self._batches or 1
+        dispatched = self._batch_size_total or 1
+
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "preparing": self._preparing,
+            "reserved": self._reserved,
+            "max_queue_size": self.max_queue_size,
+            "batches_in_flight": self._in_flight,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "requests": self._requests,
+            "rejected": self._rejected,
+            "batches": self._batches,
+            "avg_batch_size": self._batch_size_total / batches,
+            "largest_batch": self._largest_batch,
+            "batch_size_counts": dict(self._batch_size_counts),
+            "avg_wait_ms": self._wait_total / dispatched * 1000,
+            "max_wait_ms_seen": self._wait_max * 1000,
+            "avg_inference_ms": self._inference_total / batches * 1000,
+            "metric_totals": dict(self._metric_totals)
+        }
 
-# 尝试导入音频处理库
-try:
-    from pydub import AudioSegment
-    PYDUB_AVAILABLE = True
-except ImportError:
-    PYDUB_AVAILABLE = False
-    logging.warning("pydub not available - audio conversion disabled")
 
 class VoiceProcessor:
-    def __init__(self, model_size: str = "base"):
+    def __init__(self, model_size: str = "base", batch_size: int = 8, batch_wait_ms: float = 50.0,
+                 backend: str = "thread", workers: int = 2, torch_threads: Optional[int] = None,
+                 max_queue_size: int = 32, cascade_model_size: Optional[str] = None,
+                 quantize: bool = False, vad: bool = True, max_seconds: Optional[float] = 120.0):
         """
         初始化语音处理器
         
         Args:
             model_size: Whisper模型大小 ("tiny", "base", "small", "medium", "large")
+            batch_size: 单次批量推理最多合并的语音条数
+            batch_wait_ms: 凑批的最长等待时间（毫秒）
+            backend: 推理后端，"thread"（进程内线程池）或 "process"（独立进程池）
+            workers: "process" 后端的工作进程数
+            torch_threads: 每个工作进程（或本进程）的 torch intra-op 线程数，None 表示 torch 默认值
+            max_queue_size: 等待中的转录请求上限，超过时返回 TRANSCRIPTION_BUSY
+            cascade_model_size: 级联升级使用的大模型（如 "base"），设置后 model_size
+                应为小模型（如 "tiny"），只有低置信度片段才交给大模型；None 表示不级联
+            quantize: 对 Whisper 的线性层做 int8 动态量化（仅 CPU），量化结果缓存在磁盘上
+            vad: 推理前用语音活动检测裁掉首尾静音，并跳过没有语音的片段
+            max_seconds: 每条语音最多处理的秒数（仅在启用 vad 时生效），None 表示不限
         """
         self.model = None
         self.available = False
+        self.state = MODEL_NOT_LOADED
+        self.load_seconds: Optional[float] = None
         self.model_size = model_size
-        
+        self.backend = backend
+        self.workers = max(1, workers)
+        self.torch_threads = torch_threads
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.cascade = CascadePolicy(cascade_model_size) if cascade_model_size else None
+        self.quantize = quantize
+        self.vad = VoiceActivityDetector(max_seconds=max_seconds) if vad else None
+        self._ready = asyncio.Event()
+
+        # 流式转录的首段文本延迟统计
+        self._streams = 0
+        self._first_text_total = 0.0
+        self._first_text_max = 0.0
+        self._stream_total = 0.0
+
+        if backend == "process":
+            # 模型只在工作进程中加载，推理不再与事件循环争抢 GIL；
+            # 进程池在 start() 中创建，避免 spawn 子进程导入主模块时递归创建进程
+            self.batcher = TranscriptionBatcher(
+                _worker_transcribe_batch,
+                max_batch_size=batch_size,
+                max_wait_ms=batch_wait_ms,
+                max_queue_size=max_queue_size,
+                max_concurrent_batches=self.workers
+            )
+        else:
+            self.batcher = TranscriptionBatcher(
+                self._transcribe_batch_sync,
+                max_batch_size=batch_size,
+                max_wait_ms=batch_wait_ms,
+                max_queue_size=max_queue_size
+            )
+
+    async def load(self):
+        """
+        在后台加载模型并用一段静音做预热推理，不阻塞事件循环。
+        应在 main() 中作为后台任务启动；重复调用不会重复加载。
+        """
+        if self.state != MODEL_NOT_LOADED:
+            return
+
+        self.state = MODEL_LOADING
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
         try:
-            logging.info(f"Loading Whisper model: {model_size}")
-            self.model = whisper.load_model(model_size)
+            if self.backend == "process":
+                self.start()
+                # 同时提交多个预热任务，让每个工作进程都加载并预热模型
+                warmed = await asyncio.gather(*[
+                    loop.run_in_executor(self.pool, _worker_warm_up)
+                    for _ in range(self.workers)
+                ])
+                if not all(warmed):
+                    raise RuntimeError("Whisper model failed to load in a worker process")
+            else:
+                self.model = await loop.run_in_executor(None, self._load_sync)
+
             self.available = True
-            logging.info("Whisper model loaded successfully")
+            self.state = MODEL_READY
+            self.load_seconds = time.perf_counter() - started
+            logging.info(f"Whisper {self.model_size} ready after {self.load_seconds:.1f}s (backend: {self.backend})")
+
         except Exception as e:
             logging.error(f"Failed to load Whisper model: {e}")
             self.model = None
             self.available = False
+            self.state = MODEL_FAILED
+
+        finally:
+            self._ready.set()
+
+    def _load_sync(self):
+        if self.torch_threads:
+            import torch
+            torch.set_num_threads(self.torch_threads)
+
+        model = get_model(self.model_size, self.quantize)
+        warm_up(model)
+        return model
+
+    def is_ready(self) -> bool:
+        """
+        模型是否已加载并预热完成
+
+        Returns:
+            bool: 可以立即转录时为 True
+        """
+        return self.state == MODEL_READY
+
+    async def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待模型就绪；若尚未开始加载则先启动加载
+
+        Args:
+            timeout: 最长等待秒数，None 表示一直等待
+
+        Returns:
+            bool: 模型在超时前就绪时为 True
+        """
+        if self.state == MODEL_NOT_LOADED:
+            asyncio.get_running_loop().create_task(self.load())
+
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        return self.is_ready()
     
-    async def transcribe_voice(self, voice_file_bytes: bytes) -> Tuple[str, str]:
+    async def transcribe_voice(self, voice_file_bytes: Union[bytes, memoryview],
+                               ready_timeout: Optional[float] = 60.0) -> Tuple[str, str]:
         """
-        异步转录语音文件
+        异步转录语音文件。模型仍在加载时，请求会排队等待它就绪。
         
         Args:
-            voice_file_bytes: 语音文件的字节数据
+            voice_file_bytes: 语音文件的字节数据（bytes 或 memoryview，无需复制）
+            ready_timeout: 等待模型就绪的最长秒数
             
         Returns:
             Tuple[str, str]: (转录文本, 语言代码)
         """
-        if not self.available:
-            logging.error("Whisper model not available")
+        if not await self.wait_until_ready(ready_timeout):
+            logging.error(f"Whisper model not available (state: {self.state})")
             return "", "en"
             
         if not voice_file_bytes:
             logging.error("Empty voice file bytes")
             return "", "en"
             
+        if self.backend == "process":
+            # memoryview 无法跨进程传递
+            voice_file_bytes = bytes(voice_file_bytes)
+
         try:
-            # 在线程池中运行CPU密集型任务
-            loop = asyncio.get_event_loop()
-            text, language = await loop.run_in_executor(
-                None, 
-                self._transcribe_sync, 
-                voice_file_bytes
-            )
+            # 交给批处理队列，与同一时间窗口内的其他请求一起推理
+            text, language = await self.batcher.submit(voice_file_bytes)
             
             return text, language
             
+        except TranscriptionBusyError as e:
+            logging.warning(f"Voice transcription rejected: {e}")
+            return "", TRANSCRIPTION_BUSY
+
         except Exception as e:
             logging.error(f"Voice transcription error: {e}")
             return "", "en"
     
-    def _transcribe_sync(self, voice_file_bytes: bytes) -> Tuple[str, str]:
+    async def transcribe_stream(self, voice_file_bytes: Union[bytes, memoryview],
+                                chunk_seconds: float = 15.0, overlap_seconds: float = 1.5,
+                                ready_timeout: Optional[float] = 60.0) -> AsyncIterator[Tuple[str, str, bool]]:
         """
-        同步转录方法，在线程池中运行
-        
+        流式转录：把长语音切成相互重叠的片段，每完成一段就产出一次目前为止的完整文本。
+        最后一次产出标记为最终结果；短语音只产出一次。
+
         Args:
             voice_file_bytes: 语音文件的字节数据
-            
-        Returns:
-            Tuple[str, str]: (转录文本, 语言代码)
+            chunk_seconds: 每个片段的长度（秒）
+            overlap_seconds: 相邻片段重叠的长度（秒）
+            ready_timeout: 等待模型就绪的最长秒数
+
+        Yields:
+            Tuple[str, str, bool]: (目前为止的转录文本, 语言代码, 是否为最终结果)；
+            队列已满时在产出任何文本之前产出 ("", TRANSCRIPTION_BUSY, True)
         """
-        temp_path = None
-        converted_path = None
-        
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+
+        if not await self.wait_until_ready(ready_timeout):
+            logging.error(f"Whisper model not available (state: {self.state})")
+            return
+
+        if not voice_file_bytes:
+            logging.error("Empty voice file bytes")
+            return
+
+        if self.backend == "process":
+            # memoryview 无法跨进程传递
+            voice_file_bytes = bytes(voice_file_bytes)
+
         try:
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".ogg") as temp_file:
-                temp_file.write(voice_file_bytes)
-                temp_path = temp_file.name
-
-            # 尝试音频格式转换（如果需要）
-            audio_path = self._convert_audio_if_needed(temp_path)
-            if audio_path != temp_path:
-                converted_path = audio_path
-
-            # 执行转录
-            logging.info(f"Transcribing audio file: {audio_path}")
-            result = self.model.transcribe(
-                audio_path,
-                fp16=False,  # 在CPU上禁用fp16
-                language=None,  # 自动检测语言
-                task="transcribe"
-            )
-            
-            # 安全地提取结果
-            text = result.get("text", "").strip() if result else ""
-            detected_language = result.get("language", "en") if result else "en"
-            
-            # 确保 detected_language 不为 None
-            if not detected_language or not isinstance(detected_language, str):
-                detected_language = "en"
-            
-            # 语言映射
-            language_map = {
-                "german": "de",
-                "deutsch": "de", 
-                "de": "de",
-                "english": "en",
-                "en": "en"
-            }
-            
-            # 安全地处理语言检测
-            try:
-                language = language_map.get(detected_language.lower().strip(), "en")
-            except (AttributeError, TypeError):
-                language = "en"
-            
-            logging.info(f"Transcribed: '{text}' (detected: {detected_language} -> {language})")
-            
-            # 验证转录结果
-            if not text or len(text.strip()) < 1:
-                logging.warning("Empty or too short transcription result")
-                return "", "en"
-            
-            return text, language
-            
+            audio, skipped = await self.batcher.prepare(prepare_audio, voice_file_bytes, self.vad)
+        except TranscriptionBusyError as e:
+            logging.warning(f"Voice transcription rejected: {e}")
+            yield "", TRANSCRIPTION_BUSY, True
+            return
         except Exception as e:
-            logging.error(f"Sync transcription error: {e}")
-            return "", "en"
+            logging.error(f"Voice decoding error: {e}")
+            return
+
+        if audio is None:
+            return
+
+        # VAD 统计按整条语音计一次，各片段在 transcribe_batch 中不再计入
+        self.batcher.record_metrics({
+            "audio_seconds": audio.shape[0] / SAMPLE_RATE + float(skipped),
+            "skipped_seconds": float(skipped),
+            "no_speech_clips" if audio.size == 0 else "clips": 1
+        })
+        if audio.size == 0:
+            return
+
+        chunks = split_chunks(audio, chunk_seconds, overlap_seconds)
+        text, language = "", "en"
+        first_text_at = None
+        pending = []
+
+        # 整条语音只准入一次：所有片段的名额在产出任何文本之前预留好
+        try:
+            reserved = self.batcher.reserve(len(chunks))
+        except TranscriptionBusyError as e:
+            logging.warning(f"Voice transcription rejected: {e}")
+            yield "", TRANSCRIPTION_BUSY, True
+            return
+
+        try:
+            # 第一段单独提交以尽快得到首段文本，其余片段一起提交以便合并成批
+            pending = [asyncio.ensure_future(self.batcher.submit(chunks[0], reserved=True))]
+            for index in range(len(chunks)):
+                chunk_text, chunk_language = await pending[index]
+                if index == 0:
+                    pending.extend(asyncio.ensure_future(self.batcher.submit(chunk, reserved=True))
+                                   for chunk in chunks[1:])
+
+                is_final = index == len(chunks) - 1
+                if chunk_text:
+                    if not text:
+                        language = chunk_language
+                    text = merge_overlap(text, chunk_text)
+                    if first_text_at is None:
+                        first_text_at = loop.time()
+                elif not is_final or not text:
+                    continue
+
+                yield text, language, is_final
+
+        except Exception as e:
+            logging.error(f"Streaming transcription error: {e}")
+
         finally:
-            # 清理临时文件
-            for path in [temp_path, converted_path]:
-                if path and os.path.exists(path):
-                    try:
-                        os.unlink(path)
-                        logging.debug(f"Cleaned up temp file: {path}")
-                    except Exception as cleanup_error:
-                        logging.warning(f"Failed to cleanup temp file {path}: {cleanup_error}")
-    
-    def _convert_audio_if_needed(self, input_path: str) -> str:
+            for future in pending:
+                future.cancel()
+            self.batcher.release(reserved)
+
+            if first_text_at is not None:
+                first_text = first_text_at - started
+                self._streams += 1
+                self._first_text_total += first_text
+                self._first_text_max = max(self._first_text_max, first_text)
+                self._stream_total += loop.time() - started
+                logging.info(f"Streamed transcription of {len(chunks)} chunk(s): "
+                             f"first text after {first_text:.2f}s, done after {loop.time() - started:.2f}s")
+
+    def get_stream_stats(self) -> dict:
         """
-        如果需要，转换音频格式
-        
+        获取流式转录统计：首段文本延迟（time-to-first-text）和总耗时
+
+        Returns:
+            dict: 流式转录统计信息
+        """
+        streams = self._streams or 1
+
+        return {
+            "streams": self._streams,
+            "avg_time_to_first_text_ms": self._first_text_total / streams * 1000,
+            "max_time_to_first_text_ms": self._first_text_max * 1000,
+            "avg_total_ms": self._stream_total / streams * 1000
+        }
+
+    def _transcribe_batch_sync(self, voice_files: List[Union[bytes, memoryview]]) -> Tuple[List[Tuple[str, str]], dict]:
+        """
+        同步批量转录方法，在线程池中运行
+
         Args:
-            input_path: 输入音频文件路径
-            
+            voice_files: 多条语音文件的字节数据
+
         Returns:
-            str: 转换后的音频文件路径（如果不需要转换则返回原路径）
+            Tuple[List[Tuple[str, str]], dict]: 与输入顺序一致的 (转录文本, 语言代码) 列表和阶段统计
         """
-        if not PYDUB_AVAILABLE:
-            return input_path
-            
-        try:
-            # 检测文件格式
-            file_ext = os.path.splitext(input_path)[1].lower()
-            
-            # 如果是Whisper支持的格式，直接返回
-            supported_formats = ['.wav', '.mp3', '.m4a', '.flac']
-            if file_ext in supported_formats:
-                return input_path
-            
-            # 转换为WAV格式
-            logging.info(f"Converting {file_ext} to WAV format")
-            audio = AudioSegment.from_file(input_path)
-            
-            # 转换为单声道，16kHz采样率（Whisper推荐）
-            audio = audio.set_channels(1).set_frame_rate(16000)
-            
-            # 创建转换后的临时文件
-            converted_path = input_path.replace('.ogg', '_converted.wav')
-            audio.export(converted_path, format="wav")
-            
-            logging.info(f"Audio converted successfully: {converted_path}")
-            return converted_path
-            
-        except Exception as e:
-            logging.warning(f"Audio conversion failed: {e}, using original file")
-            return input_path
-    
+        return transcribe_batch(self.model, voice_files, self.cascade, self.quantize, self.vad)
+
+    def start(self):
+        """
+        创建 "process" 后端的进程池，工作进程在启动时加载模型
+        """
+        if self.backend != "process" or self.pool is not None:
+            return
+
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_size, self.torch_threads, self.cascade, self.quantize, self.vad)
+        )
+        self.batcher.executor = self.pool
+
+        logging.info(f"Started {self.workers} transcription worker process(es) "
+                     f"with {self.torch_threads or 'default'} torch thread(s) each")
+
+    def is_busy(self) -> bool:
+        """
+        转录队列是否已满，可在下载语音前提前检查
+
+        Returns:
+            bool: 队列已满时为 True
+        """
+        return self.batcher.is_full()
+
+    def shutdown(self):
+        """
+        关闭转录工作进程
+        """
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def get_cascade_stats(self) -> dict:
+        """
+        获取级联统计：升级比例和每一级的平均延迟
+
+        Returns:
+            dict: 级联统计信息
+        """
+        totals = self.batcher.get_stats()["metric_totals"]
+        segments = totals.get("segments", 0)
+        batches = totals.get("batches", 0)
+        escalation_batches = totals.get("escalation_batches", 0)
+
+        return {
+            "enabled": self.cascade is not None,
+            "tier1_model": self.model_size,
+            "tier2_model": self.cascade.escalation_model_size if self.cascade else None,
+            "segments": segments,
+            "escalated_segments": totals.get("escalated_segments", 0),
+            "escalation_rate": totals.get("escalated_segments", 0) / segments if segments else 0.0,
+            "tier1_avg_ms": totals.get("tier1_seconds", 0.0) / batches * 1000 if batches else 0.0,
+            "tier2_avg_ms": totals.get("tier2_seconds", 0.0) / escalation_batches * 1000 if escalation_batches else 0.0
+        }
+
+    def get_vad_stats(self) -> dict:
+        """
+        获取语音活动检测统计：跳过的音频秒数，用于衡量节省的 CPU
+
+        Returns:
+            dict: 语音活动检测统计信息
+        """
+        totals = self.batcher.get_stats()["metric_totals"]
+        messages = totals.get("clips", 0) + totals.get("no_speech_clips", 0)
+        audio_seconds = totals.get("audio_seconds", 0.0)
+        skipped_seconds = totals.get("skipped_seconds", 0.0)
+
+        return {
+            "enabled": self.vad is not None,
+            "messages": messages,
+            "no_speech_messages": totals.get("no_speech_clips", 0),
+            "audio_seconds": audio_seconds,
+            "skipped_seconds": skipped_seconds,
+            "skipped_per_message": skipped_seconds / messages if messages else 0.0,
+            "skipped_ratio": skipped_seconds / audio_seconds if audio_seconds else 0.0
+        }
+
     def get_model_info(self) -> dict:
         """
         获取模型信息
@@ -197,7 +1306,17 @@ class VoiceProcessor:
         """
         return {
             "available": self.available,
+            "state": self.state,
+            "load_seconds": self.load_seconds,
             "model_size": self.model_size,
-            "pydub_available": PYDUB_AVAILABLE,
-            "model_loaded": self.model is not None
+            "quantized": self.quantize,
+            "backend": self.backend,
+            "workers": self.workers if self.backend == "process" else 0,
+            "torch_threads": self.torch_threads,
+            "ffmpeg_available": FFMPEG_AVAILABLE,
+            "model_loaded": self.is_ready(),
+            "batching": self.batcher.get_stats(),
+            "cascade": self.get_cascade_stats(),
+            "vad": self.get_vad_stats(),
+            "streaming": self.get_stream_stats()
         }
\ No newline at end of file